@@ -32,25 +32,28 @@ python3 ~/RedditVideoMakerBot-master/elevenLabsKeyRotator.py 2>&1 | tee -a "$LOG
 
 sleep 60
 
+# The daemon loaded config.toml when it started, so the rotated key is sent along with the job.
+# It is JSON quoted, a key of only digits would be read as a number otherwise
+ELEVENLABS_API_KEY=$(python3 -c 'import json, toml; print(json.dumps(toml.load("config.toml")["settings"]["tts"]["elevenlabs_api_key"]))')
 
-# Run the Python script
-log "Running main.py"
-python3 ~/RedditVideoMakerBot-master/main.py 2>&1 | tee -a "$LOG_FILE"
 
-# Sleep for 1 minute
-log "Sleeping for 60 seconds."
-sleep 60
+# Start the render daemon if it isn't running, it keeps the models and the browser loaded between runs
+if ! pgrep -f "main.py --daemon" > /dev/null; then
+    log "Starting the render daemon."
+    nohup python3 ~/RedditVideoMakerBot-master/main.py --daemon >> "$LOG_FILE" 2>&1 &
+fi
 
-# Find the latest created .mp4 file
-log "Finding the latest .mp4 file in the results directory."
-latest_file=$(ls -t ~/RedditVideoMakerBot-master/results/AmItheAsshole+relationship_advice+confession+tifu/*.mp4 | head -n 1)
+# Queue a video and wait for it, the daemon records the path of the finished file in the job
+log "Queueing a video for the render daemon."
+latest_file=$(python3 -m utils.job_queue enqueue --wait \
+    --set "settings.tts.elevenlabs_api_key=$ELEVENLABS_API_KEY" 2>> "$LOG_FILE")
 
 if [[ -z "$latest_file" ]]; then
-    log "No .mp4 files found! Exiting."
+    log "The video failed! Exiting."
     deactivate  # Deactivate the virtual environment before exiting
     exit 1
 else
-    log "Found latest file: $latest_file"
+    log "Finished video: $latest_file"
 fi
 
 # Extract the file name without the .mp4 extension
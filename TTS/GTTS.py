@@ -6,6 +6,8 @@ from utils import settings
 
 
 class GTTS:
+    max_in_flight = 4
+
     def __init__(self):
         self.max_chars = 5000
         self.voices = []
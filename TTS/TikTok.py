@@ -79,6 +79,9 @@ vocals: Final[tuple] = (
 class TikTok:
     """TikTok Text-to-Speech Wrapper"""
 
+    max_in_flight = 4
+    cache_settings = ("tiktok_voice",)
+
     def __init__(self):
         headers = {
             "User-Agent": "com.zhiliaoapp.musically/2022600030 (Linux; U; Android 7.1.2; es_ES; SM-G988N; "
@@ -26,6 +26,9 @@ voices = [
 
 
 class AWSPolly:
+    max_in_flight = 4
+    cache_settings = ("aws_polly_voice",)
+
     def __init__(self):
         self.max_chars = 3000
         self.voices = voices
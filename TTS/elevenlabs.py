@@ -7,14 +7,18 @@ from utils import settings
 
 
 class elevenlabs:
+    max_in_flight = 2
+    cache_settings = ("elevenlabs_voice_name",)
+    model_id = "eleven_multilingual_v1"
+
     def __init__(self):
         self.max_chars = 2500
         self.client: ElevenLabs = None
+        self.api_key = None  # Key the client was made with
         self.current_voice = None  # Cache the current voice for this content piece
 
     def run(self, text, filepath, random_voice: bool = False):
-        if self.client is None:
-            self.initialize()
+        self.ensure_client()
         
         try:
             if random_voice:
@@ -31,7 +35,7 @@ class elevenlabs:
 
             print(f"Using ElevenLabs voice: {voice}")
             
-            audio = self.client.generate(text=text, voice=voice, model="eleven_multilingual_v1")
+            audio = self.client.generate(text=text, voice=voice, model=self.model_id)
             save(audio=audio, filename=filepath)
             
         except Exception as e:
@@ -40,12 +44,19 @@ class elevenlabs:
             
             # Try with default voice as fallback
             try:
-                audio = self.client.generate(text=text, voice="Bella", model="eleven_multilingual_v1")
+                audio = self.client.generate(text=text, voice="Bella", model=self.model_id)
                 save(audio=audio, filename=filepath)
+                return False  # not the configured voice, the clip must not be cached
             except Exception as fallback_error:
                 print(f"Fallback also failed: {fallback_error}")
                 raise fallback_error
 
+    def ensure_client(self):
+        """Creates the client, again if the configured key changed, e.g. by a job override."""
+        api_key = settings.config["settings"]["tts"]["elevenlabs_api_key"]
+        if self.client is None or self.api_key != api_key:
+            self.initialize()
+
     def initialize(self):
         api_key = settings.config["settings"]["tts"]["elevenlabs_api_key"]
         
@@ -56,14 +67,14 @@ class elevenlabs:
 
         try:
             self.client = ElevenLabs(api_key=api_key)
+            self.api_key = api_key
             print("ElevenLabs client initialized successfully")
         except Exception as e:
             print(f"Error initializing ElevenLabs client: {e}")
             raise ValueError(f"Failed to initialize ElevenLabs client: {e}")
 
     def randomvoice(self):
-        if self.client is None:
-            self.initialize()
+        self.ensure_client()
         
         try:
             # Get all voices
@@ -1,22 +1,45 @@
 import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Tuple
+from queue import Queue
+from typing import Dict, List, Optional, Tuple
 
+import ffmpeg
 import numpy as np
-import translators
-from moviepy.audio.AudioClip import AudioClip
-from moviepy.audio.fx.volumex import volumex
-from moviepy.editor import AudioFileClip
-from rich.progress import track
-
-from utils import settings
-from utils.console import print_step, print_substep
+
+from utils import profiling, settings
+from utils.cache import ContentCache, get_cache_dir
+from utils.console import print_step, print_substep, track
+from utils.durations import get_audio_duration, get_audio_format, save_durations
 from utils.voice import sanitize_text
 
 DEFAULT_MAX_LENGTH: int = (
     5  # Video length variable, edit this on your own risk. It should work, but it's not supported
 )
+# About how fast the TTS providers read, until the first clips of a thread tell
+SECONDS_PER_CHAR: float = 1 / 15
+
+# Idle TTS module instances by class, reused by the following videos so their clients stay alive
+_idle_tts_modules: Dict[type, list] = {}
+_idle_tts_modules_lock = threading.Lock()
+
+
+def acquire_tts_module(tts_class):
+    """Returns an idle instance of the TTS module, or a new one if all of them are in use."""
+    with _idle_tts_modules_lock:
+        idle = _idle_tts_modules.get(tts_class)
+        if idle:
+            return idle.pop()
+    return tts_class()
+
+
+def release_tts_module(tts_module) -> None:
+    """Returns an instance of a TTS module to the idle instances."""
+    with _idle_tts_modules_lock:
+        _idle_tts_modules.setdefault(type(tts_module), []).append(tts_module)
 
 
 class TTSEngine:
@@ -30,6 +53,8 @@ class TTSEngine:
 
     Notes:
         tts_module must take the arguments text and filepath.
+        tts_module can set max_in_flight to the number of requests its service handles at the
+        same time. Comments are synthesized concurrently by that many instances of it.
     """
 
     def __init__(
@@ -40,7 +65,8 @@ class TTSEngine:
         max_length: int = DEFAULT_MAX_LENGTH,
         last_clip_length: int = 0,
     ):
-        self.tts_module = tts_module()
+        self.tts_class = tts_module
+        self.tts_module = acquire_tts_module(tts_module)
         self.reddit_object = reddit_object
 
         self.redditid = re.sub(r"[^\w\s-]", "", reddit_object["thread_id"])
@@ -48,6 +74,9 @@ class TTSEngine:
         self.max_length = max_length
         self.length = 0
         self.last_clip_length = last_clip_length
+        self.durations = {}
+        max_in_flight = settings.config["settings"]["tts"]["max_in_flight"]
+        self.max_in_flight = max(1, max_in_flight or getattr(tts_module, "max_in_flight", 1))
 
     def add_periods(
         self,
@@ -67,6 +96,12 @@ class TTSEngine:
             comment["comment_body"] = re.sub(r'\."\.', '".', comment["comment_body"])
 
     def run(self) -> Tuple[int, int]:
+        try:
+            return self.save_all()
+        finally:
+            release_tts_module(self.tts_module)
+
+    def save_all(self) -> Tuple[int, int]:
         Path(self.path).mkdir(parents=True, exist_ok=True)
         print_step("Saving Text to MP3 files...")
 
@@ -93,29 +128,118 @@ class TTSEngine:
                     self.call_tts(f"postaudio-{idx}", process_text(text))
 
         else:
-            for idx, comment in track(enumerate(self.reddit_object["comments"]), "Saving..."):
-                # ! Stop creating mp3 files if the length is greater than max length.
-                if self.length > self.max_length and idx > 1:
-                    self.length -= self.last_clip_length
-                    idx -= 1
-                    break
-                
-                # Reset voice cache for new content piece (comment)
-                if hasattr(self.tts_module, 'reset_voice_cache'):
-                    self.tts_module.reset_voice_cache()
-                    
-                if (
-                    len(comment["comment_body"]) > self.tts_module.max_chars
-                ):  # Split the comment if it is too long
-                    self.split_post(comment["comment_body"], idx)  # Split the comment
-                else:  # If the comment is not too long, just call the tts engine
-                    self.call_tts(f"{idx}", process_text(comment["comment_body"]))
+            idx = self.save_comments()
 
+        save_durations(self.path, self.durations)
         print_substep("Saved Text to MP3 files successfully.", style="bold green")
         return self.length, idx
 
-   
+    def save_comments(self) -> int:
+        """Synthesizes the comments until their total length passes max_length.
+
+        Up to max_in_flight comments are synthesized at the same time, each by its own instance of
+        the TTS module, while the results are added in the order of the comments. The length, the
+        cutoff and the files are therefore the same as when the comments are read one by one.
+
+        A comment is only sent ahead while the comments before it likely fit in max_length, as
+        estimated from the clips so far. A request that was sent can't be taken back, so a
+        comment that still ends up past the cutoff is paid for, with the TTS cache on its clip is
+        kept for later runs.
+
+        Returns:
+            int: The index of the last comment, as the number of comments for the video
+        """
+        comments = self.reddit_object["comments"]
+        tts_modules = Queue()
+        tts_modules.put(self.tts_module)
+        # The comments are synthesized in worker threads, their spans belong to the TTS stage
+        stage_span = profiling.current_span()
+
+        def synthesize_comment(idx: int, comment: dict):
+            tts_module = tts_modules.get()
+            try:
+                with profiling.span("comment", stage_span, index=idx):
+                    # Reset voice cache for new content piece (comment)
+                    if hasattr(tts_module, "reset_voice_cache"):
+                        tts_module.reset_voice_cache()
+                    if (
+                        len(comment["comment_body"]) > tts_module.max_chars
+                    ):  # Split the comment if it is too long
+                        return self.synthesize_split(
+                            tts_module, comment["comment_body"], idx
+                        )  # Split the comment
+                    # If the comment is not too long, just call the tts engine
+                    duration = self.synthesize(
+                        tts_module, f"{idx}", process_text(comment["comment_body"])
+                    )
+                    return [(f"{idx}", duration)], None
+            finally:
+                tts_modules.put(tts_module)
+
+        chars_read = len(self.reddit_object["thread_title"])  # of the clips in self.length
+
+        def estimated_seconds(comment: dict) -> float:
+            rate = self.length / chars_read if self.length else SECONDS_PER_CHAR
+            return len(comment["comment_body"]) * rate
+
+        idx = 0
+        futures = {}
+        extra_tts_modules = []
+        # Given back even when a comment fails, the daemon keeps using them for the next videos
+        try:
+            for _ in range(min(self.max_in_flight, len(comments)) - 1):
+                extra_tts_modules.append(acquire_tts_module(self.tts_class))
+            for tts_module in extra_tts_modules:
+                tts_modules.put(tts_module)
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+                try:
+                    for idx, comment in track(enumerate(comments), "Saving..."):
+                        # ! Stop creating mp3 files if the length is greater than max length.
+                        if self.length > self.max_length and idx > 1:
+                            self.length -= self.last_clip_length
+                            idx -= 1
+                            break
+                        # Keep the next comments synthesizing while this one is waited for, as long
+                        # as the video likely still has room for them
+                        expected_length = self.length
+                        for ahead in range(idx, min(idx + self.max_in_flight, len(comments))):
+                            if ahead > 1 and expected_length > self.max_length:
+                                break
+                            if ahead not in futures:
+                                futures[ahead] = executor.submit(
+                                    synthesize_comment, ahead, comments[ahead]
+                                )
+                            expected_length += estimated_seconds(comments[ahead])
+                        clips, combined_duration = futures.pop(idx).result()
+                        for filename, duration in clips:
+                            self.add_clip(filename, duration)
+                        if combined_duration is not None:
+                            self.add_combined_clip(f"{idx}", clips, combined_duration)
+                        chars_read += len(comment["comment_body"])
+                finally:
+                    # Comments past the cutoff that did not start yet are not needed anymore
+                    for future in futures.values():
+                        future.cancel()
+        finally:
+            for tts_module in extra_tts_modules:
+                release_tts_module(tts_module)
+        return idx
+
     def split_post(self, text: str, idx):
+        clips, combined_duration = self.synthesize_split(self.tts_module, text, idx)
+        for filename, duration in clips:
+            self.add_clip(filename, duration)
+        self.add_combined_clip(f"{idx}", clips, combined_duration)
+
+    def synthesize_split(
+        self, tts_module, text: str, idx
+    ) -> Tuple[List[Tuple[str, Optional[float]]], float]:
+        """Synthesizes a text that is too long for the TTS module in parts and joins them.
+
+        Returns:
+            The name and duration of every part, and the duration of the joined clip
+        """
+        clips = []
         split_files = []
         
         # Split text into smaller chunks
@@ -155,7 +279,9 @@ class TTSEngine:
 
         print(f"Total chunks: {len(split_text)}")
 
-        self.create_silence_mp3()
+        silence_path = None
+        # Every comment has its own list, comments can be split at the same time
+        list_path = f"{self.path}/list-{idx}.txt"
 
         # IMPORTANT: Use the same voice for all chunks of the same content
         # Only randomize voice ONCE per content piece, not per chunk
@@ -173,72 +299,165 @@ class TTSEngine:
                 # For all chunks after the first, force random_voice=False to use the same voice
                 if idy == 0:
                     # First chunk: use random voice if enabled
-                    self.call_tts(f"{idx}-{idy}.part", newtext, force_random_voice=use_random_voice)
+                    random_voice = use_random_voice
                 else:
                     # Subsequent chunks: force same voice (random_voice=False)
-                    self.call_tts(f"{idx}-{idy}.part", newtext, force_random_voice=False)
-                    
-                with open(f"{self.path}/list.txt", "a") as f:
+                    random_voice = False
+                duration = self.synthesize(
+                    tts_module, f"{idx}-{idy}.part", newtext, force_random_voice=random_voice
+                )
+                clips.append((f"{idx}-{idy}.part", duration))
+
+                if silence_path is None:
+                    # -c copy needs the silence in the same format as the parts
+                    silence_path = self.create_silence_mp3(
+                        *get_audio_format(f"{self.path}/{idx}-{idy}.part.mp3")
+                    )
+                with open(list_path, "a") as f:
                     f.write(f"file '{idx}-{idy}.part.mp3'\n")
-                    f.write("file 'silence.mp3'\n")
+                    f.write(f"file '{silence_path}'\n")
                 split_files.append(str(f"{self.path}/{idx}-{idy}.part.mp3"))
 
         # Combine all parts into a single MP3
+        if os.path.lexists(f"{self.path}/{idx}.mp3"):
+            os.unlink(f"{self.path}/{idx}.mp3")  # it may be a hardlink of a cached clip
+        profiling.count_subprocess()
         os.system(
             f"ffmpeg -f concat -y -hide_banner -loglevel panic -safe 0 "
-            f"-i {self.path}/list.txt "
+            f"-i {list_path} "
             f"-c copy {self.path}/{idx}.mp3"
         )
+        combined_duration = get_audio_duration(f"{self.path}/{idx}.mp3")
 
         # Clean up temporary files
         try:
             for file in split_files:
                 os.unlink(file)
-            os.unlink(f"{self.path}/list.txt")
+            os.unlink(list_path)
         except FileNotFoundError as e:
             print(f"File not found: {e.filename}")
         except OSError as e:
             print(f"OSError: {e}")
 
         print(f"Finished processing {len(split_files)} audio chunks")
+        return clips, combined_duration
 
+    def add_combined_clip(self, filename: str, clips, combined_duration: float):
+        # The manifest describes the combined file, not its parts
+        for part, _ in clips:
+            self.durations.pop(part, None)
+        self.durations[filename] = combined_duration
 
     def call_tts(self, filename: str, text: str, force_random_voice: bool = None):
+        self.add_clip(
+            filename,
+            self.synthesize(self.tts_module, filename, text, force_random_voice=force_random_voice),
+        )
+
+    def synthesize(
+        self, tts_module, filename: str, text: str, force_random_voice: bool = None
+    ) -> Optional[float]:
+        """Saves the text to {filename}.mp3 and returns its duration, None if it can't be read."""
         # If force_random_voice is specified, use that. Otherwise use config setting
         random_voice = force_random_voice if force_random_voice is not None else settings.config["settings"]["tts"]["random_voice"]
-        
-        self.tts_module.run(
-            text,
-            filepath=f"{self.path}/{filename}.mp3",
-            random_voice=random_voice,
-        )
+
+        filepath = f"{self.path}/{filename}.mp3"
+        cache_key = get_tts_cache_key(tts_module, text, random_voice)
+        cached = cache_key is not None and tts_cache().fetch(cache_key, filepath)
+        if not cached:
+            # Never write through a hardlink of a cached clip
+            if os.path.lexists(filepath):
+                os.unlink(filepath)
+            # A provider returns False when the clip isn't what the settings ask for, e.g. when
+            # it fell back to another voice, so the cache key of the settings doesn't fit it
+            if tts_module.run(text, filepath=filepath, random_voice=random_voice) is False:
+                cache_key = None
         # try:
         #     self.length += MP3(f"{self.path}/{filename}.mp3").info.length
         # except (MutagenError, HeaderNotFoundError):
         #     self.length += sox.file_info.duration(f"{self.path}/{filename}.mp3")
         try:
-            clip = AudioFileClip(f"{self.path}/{filename}.mp3")
-            self.last_clip_length = clip.duration
-            self.length += clip.duration
-            clip.close()
+            duration = get_audio_duration(filepath)
         except:
+            return None
+        # Only clips that could be read are cached
+        if cache_key is not None and not cached:
+            tts_cache().store(cache_key, filepath)
+        return duration
+
+    def add_clip(self, filename: str, duration: Optional[float]):
+        if duration is None:
             self.length = 0
+            return
+        self.durations[filename] = duration
+        self.last_clip_length = duration
+        self.length += duration
 
-    def create_silence_mp3(self):
-        silence_duration = settings.config["settings"]["tts"]["silence_duration"]
-        silence = AudioClip(
-            make_frame=lambda t: np.sin(440 * 2 * np.pi * t),
-            duration=silence_duration,
-            fps=44100,
+    def create_silence_mp3(self, sample_rate: int = 44100, channels: int = 1) -> str:
+        """Returns the absolute path to a silent MP3 of the configured silence duration.
+
+        The clips are cached by (duration, sample rate, channels) in assets/cache/silence and
+        are encoded straight from zeroed PCM the first time they are needed.
+        """
+        silence_duration = float(settings.config["settings"]["tts"]["silence_duration"])
+        silence_path = os.path.abspath(
+            f"{get_cache_dir('silence')}/"
+            f"silence_{silence_duration:g}s_{sample_rate}hz_{channels}ch.mp3"
         )
-        silence = volumex(silence, 0)
-        silence.write_audiofile(f"{self.path}/silence.mp3", fps=44100, verbose=False, logger=None)
+        if os.path.exists(silence_path):
+            return silence_path
+
+        frames = round(silence_duration * sample_rate)
+        pcm = np.zeros(frames * channels, dtype=np.int16)
+        # Written under a temporary name so a half written clip is never picked up
+        temp_path = f"{silence_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        profiling.count_subprocess()
+        ffmpeg.input("pipe:", f="s16le", ar=sample_rate, ac=channels).output(
+            temp_path, f="mp3", ar=sample_rate, ac=channels
+        ).overwrite_output().run(input=pcm.tobytes(), quiet=True)
+        os.replace(temp_path, silence_path)
+        return silence_path
+
+
+@lru_cache(maxsize=None)
+def tts_cache() -> ContentCache:
+    return ContentCache(
+        "tts", settings.config["settings"]["tts"]["cache_max_mb"] * 1024 * 1024, suffix=".mp3"
+    )
+
+
+def get_tts_cache_key(tts_module, text: str, random_voice: bool) -> Optional[str]:
+    """Returns the key of a clip in the TTS cache, None if the clip must not be cached.
+
+    The key covers the provider, the voice settings it declares in cache_settings, its model,
+    the language and the processed text. Clips of a random voice share a key per text, any of
+    the voices is fine then.
+    """
+    if not settings.config["settings"]["tts"]["cache_max_mb"]:
+        return None
+    if not getattr(tts_module, "cacheable", True):
+        return None
+    tts_settings = settings.config["settings"]["tts"]
+    voice = (
+        "random"
+        if random_voice
+        else [str(tts_settings[key]) for key in getattr(tts_module, "cache_settings", ())]
+    )
+    return ContentCache.key(
+        type(tts_module).__name__,
+        voice,
+        getattr(tts_module, "model_id", None),
+        settings.config["reddit"]["thread"]["post_lang"],
+        text,
+    )
 
 
 def process_text(text: str, clean: bool = True):
     lang = settings.config["reddit"]["thread"]["post_lang"]
     new_text = sanitize_text(text) if clean else text
     if lang:
+        import translators
+
         print_substep("Translating Text...")
         translated_text = translators.translate_text(text, translator="google", to_language=lang)
         new_text = sanitize_text(translated_text)
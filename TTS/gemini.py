@@ -13,7 +13,11 @@ from utils import settings
 
 class GeminiTTS:
     """Google Gemini 2.5 Pro TTS Wrapper"""
-    
+
+    max_in_flight = 2
+    # Failed requests fall back to a placeholder beep, which must not be reused
+    cacheable = False
+
     def __init__(self):
         self.max_chars = 5000  # Gemini can handle longer text
         self.voices = [
@@ -6,6 +6,9 @@ from utils import settings
 
 
 class pyttsx:
+    max_in_flight = 1  # pyttsx3 drives a single local speech engine
+    cache_settings = ("python_voice", "py_voice_num")
+
     def __init__(self):
         self.max_chars = 5000
         self.voices = []
@@ -29,6 +29,9 @@ voices = [
 
 
 class StreamlabsPolly:
+    max_in_flight = 2
+    cache_settings = ("streamlabs_polly_voice",)
+
     def __init__(self):
         self.url = "https://streamlabs.com/polly/speak"
         self.max_chars = 550
@@ -0,0 +1,106 @@
+"""Compares utils.durations.get_audio_duration with moviepy's AudioFileClip on a folder of clips.
+
+Usage (from the repository root):
+    python -m benchmarks.audio_duration [directory]
+
+Without a directory, 50 MP3 clips of different lengths are generated once with ffmpeg.
+Both readers are also checked against the number of samples ffmpeg decodes from every clip,
+the script exits with 1 when get_audio_duration is off by more than DECODE_TOLERANCE.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import ffmpeg
+from moviepy.editor import AudioFileClip
+from rich.console import Console
+from rich.table import Table
+
+from utils.durations import get_audio_duration
+
+console = Console()
+
+CLIPS_DIR = "assets/temp/benchmarks/clips"
+CLIP_COUNT = 50
+# Seconds get_audio_duration may differ from the decoded length, a few samples of rounding
+DECODE_TOLERANCE = 0.002
+
+
+def make_clips(directory: str) -> str:
+    """Generates CLIP_COUNT mono TTS-like clips between 1 and 25 seconds long."""
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    for i in range(CLIP_COUNT):
+        path = f"{directory}/{i}.mp3"
+        if Path(path).is_file():
+            continue
+        ffmpeg.input(f"sine=frequency={200 + i * 10}:sample_rate=24000", f="lavfi").output(
+            path, t=1 + (i * 0.49), ac=1, **{"b:a": "64k"}
+        ).overwrite_output().run(quiet=True)
+    return directory
+
+
+def moviepy_duration(path: str) -> float:
+    clip = AudioFileClip(path)
+    duration = clip.duration
+    clip.close()
+    return duration
+
+
+def decoded_duration(path: str) -> float:
+    """Decodes the clip to 16 bit mono PCM at its own sample rate and counts the samples."""
+    probe = ffmpeg.probe(path, select_streams="a")
+    sample_rate = int(probe["streams"][0]["sample_rate"])
+    pcm, _ = (
+        ffmpeg.input(path)
+        .output("pipe:", f="s16le", ac=1, ar=sample_rate)
+        .run(capture_stdout=True, quiet=True)
+    )
+    return len(pcm) / 2 / sample_rate
+
+
+def time_reader(reader, paths):
+    start = time.perf_counter()
+    durations = [reader(path) for path in paths]
+    return time.perf_counter() - start, durations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the audio duration readers.")
+    parser.add_argument("directory", nargs="?", default=None, help="Folder of .mp3/.wav clips")
+    args = parser.parse_args()
+
+    directory = args.directory or make_clips(CLIPS_DIR)
+    paths = sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith((".mp3", ".wav"))
+    )
+
+    header_time, header_durations = time_reader(get_audio_duration, paths)
+    moviepy_time, moviepy_durations = time_reader(moviepy_duration, paths)
+    max_difference = max(abs(a - b) for a, b in zip(header_durations, moviepy_durations))
+
+    table = Table(title=f"Duration of {len(paths)} clips in {directory}")
+    for column in ("Reader", "Total (s)", "Per clip (ms)"):
+        table.add_column(column)
+    for name, elapsed in (("get_audio_duration", header_time), ("AudioFileClip", moviepy_time)):
+        table.add_row(name, f"{elapsed:.3f}", f"{elapsed / len(paths) * 1000:.2f}")
+    console.print(table)
+    console.print(f"Speedup: {moviepy_time / header_time:.1f}x")
+    console.print(f"Largest difference between the readers: {max_difference * 1000:.1f} ms")
+
+    failed = False
+    for path, duration in zip(paths, header_durations):
+        decoded = decoded_duration(path)
+        if abs(duration - decoded) > DECODE_TOLERANCE:
+            console.print(f"[bold red]{path}: {duration:.4f} s read, {decoded:.4f} s decoded")
+            failed = True
+    if not failed:
+        console.print("[bold green]get_audio_duration matches the decoded length of every clip")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
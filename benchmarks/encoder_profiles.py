@@ -0,0 +1,90 @@
+"""Reports encode speed and output size of every encoder profile on a fixed sample.
+
+Usage (from the repository root):
+    python -m benchmarks.encoder_profiles [--codec libx264] [--sample video.mp4]
+
+Without --sample a synthetic 1080x1920 clip is generated once with ffmpeg's test sources.
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+import ffmpeg
+from rich.console import Console
+from rich.table import Table
+
+from utils.encoder import encoder_profiles, get_encoder_args
+
+console = Console()
+
+BENCHMARK_DIR = "assets/temp/benchmarks"
+SAMPLE_SECONDS = 10
+SAMPLE_FPS = 30
+
+
+def make_sample(path: str) -> str:
+    """Generates the synthetic sample clip if it doesn't exist yet."""
+    if Path(path).is_file():
+        return path
+    video = ffmpeg.input(f"testsrc2=size=1080x1920:rate={SAMPLE_FPS}", f="lavfi")
+    audio = ffmpeg.input("sine=frequency=440:sample_rate=44100", f="lavfi")
+    ffmpeg.output(
+        video,
+        audio,
+        path,
+        t=SAMPLE_SECONDS,
+        **{"c:v": "libx264", "crf": 10, "preset": "ultrafast", "c:a": "aac"},
+    ).overwrite_output().run(quiet=True)
+    return path
+
+
+def count_frames(path: str) -> int:
+    stream = next(s for s in ffmpeg.probe(path)["streams"] if s["codec_type"] == "video")
+    if "nb_frames" in stream:
+        return int(stream["nb_frames"])
+    return round(float(stream["duration"]) * SAMPLE_FPS)
+
+
+def benchmark_profile(sample: str, profile_name: str, codec: str) -> dict:
+    output_path = f"{BENCHMARK_DIR}/{profile_name}.mp4"
+    start = time.perf_counter()
+    ffmpeg.output(
+        ffmpeg.input(sample),
+        output_path,
+        **get_encoder_args(profile_name, codec),
+    ).overwrite_output().run(quiet=True)
+    elapsed = time.perf_counter() - start
+    return {
+        "profile": profile_name,
+        "seconds": elapsed,
+        "fps": count_frames(output_path) / elapsed,
+        "size": os.path.getsize(output_path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the encoder profiles.")
+    parser.add_argument("--codec", default="libx264", help="ffmpeg video encoder to use")
+    parser.add_argument("--sample", default=None, help="Video to encode instead of the synthetic one")
+    args = parser.parse_args()
+
+    Path(BENCHMARK_DIR).mkdir(parents=True, exist_ok=True)
+    sample = args.sample or make_sample(f"{BENCHMARK_DIR}/sample.mp4")
+
+    table = Table(title=f"Encoder profiles ({args.codec}, {sample})")
+    for column in ("Profile", "Time (s)", "Encode fps", "Size (MB)"):
+        table.add_column(column)
+    for profile_name in encoder_profiles:
+        result = benchmark_profile(sample, profile_name, args.codec)
+        table.add_row(
+            result["profile"],
+            f"{result['seconds']:.2f}",
+            f"{result['fps']:.1f}",
+            f"{result['size'] / 1024 / 1024:.2f}",
+        )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Offline stand-ins for Reddit, the TTS providers, the browser and YouTube, used by the benchmarks.
+
+Everything is generated once into assets/temp/benchmarks and is the same on every run, so the
+benchmarks measure the bot and not the network.
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+
+import ffmpeg
+import toml
+from PIL import Image, ImageDraw, ImageFont
+
+from utils import settings
+from video_creation import background
+
+FIXTURES_DIR = os.path.dirname(os.path.abspath(__file__)) + "/fixtures"
+BENCHMARK_DIR = "assets/temp/benchmarks"
+STUB_CLIPS_DIR = f"{BENCHMARK_DIR}/stub_tts"
+BACKGROUNDS_DIR = f"{BENCHMARK_DIR}/backgrounds"
+
+MAX_CLIP_SECONDS = 20
+CHARS_PER_SECOND = 15  # About how fast the TTS providers read
+
+BACKGROUND_CREDIT = "benchmark"
+# The background has to be longer than the video, see get_start_and_end_times
+BACKGROUND_SECONDS = 120
+BACKGROUND_CONFIG = {
+    "video": ["", "background.mp4", BACKGROUND_CREDIT, "center"],
+    "audio": ["", "background.mp3", BACKGROUND_CREDIT],
+}
+
+# Colors of the dark theme, see video_creation.screenshot_downloader.get_theme
+BACKGROUND_COLOR = (33, 33, 36, 255)
+TEXT_COLOR = (240, 240, 240)
+
+
+def load_reddit_object() -> dict:
+    """Returns a fresh copy of the fixture thread, the TTS changes the comments it reads."""
+    with open(f"{FIXTURES_DIR}/reddit_object.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def default_config() -> dict:
+    """Returns the config made of the defaults of utils/.config.template.toml."""
+    types = {"int": int, "float": float, "bool": bool, "str": str}
+
+    def defaults(template: dict) -> dict:
+        config = {}
+        for key, value in template.items():
+            if isinstance(value, dict) and not any(isinstance(v, dict) for v in value.values()):
+                if "default" not in value:
+                    config[key] = None
+                elif "type" in value:
+                    config[key] = types[value["type"]](value["default"])
+                else:
+                    config[key] = value["default"]
+            elif isinstance(value, dict):
+                config[key] = defaults(value)
+        return config
+
+    return defaults(toml.load("utils/.config.template.toml"))
+
+
+def use_benchmark_config() -> None:
+    """Sets settings.config to the defaults, with the values that keep a run offline."""
+    settings.config = default_config()
+    settings.config["reddit"]["thread"]["subreddit"] = "benchmarks"
+    settings.config["reddit"]["thread"]["post_lang"] = ""
+    settings.config["settings"]["tts"]["cache_max_mb"] = 0
+    settings.config["settings"]["tts"]["max_in_flight"] = 0
+    settings.config["settings"]["background"]["background_thumbnail"] = False
+
+
+class StubTTS:
+    """A TTS provider that copies pre-made clips about as long as reading the text would take."""
+
+    max_in_flight = 4
+    cacheable = False
+
+    def __init__(self):
+        self.max_chars = 300  # Like TikTok, so the long comments are split
+        self.voices = []
+
+    def run(self, text, filepath, random_voice: bool = False):
+        seconds = min(MAX_CLIP_SECONDS, max(1, round(len(text) / CHARS_PER_SECOND)))
+        shutil.copyfile(f"{STUB_CLIPS_DIR}/{seconds}.mp3", filepath)
+
+    def randomvoice(self):
+        return None
+
+
+def make_stub_clips() -> None:
+    """Generates the clips of StubTTS, one per length in seconds."""
+    Path(STUB_CLIPS_DIR).mkdir(parents=True, exist_ok=True)
+    for seconds in range(1, MAX_CLIP_SECONDS + 1):
+        path = f"{STUB_CLIPS_DIR}/{seconds}.mp3"
+        if Path(path).is_file():
+            continue
+        ffmpeg.input(f"sine=frequency={200 + seconds * 20}:sample_rate=24000", f="lavfi").output(
+            path, t=seconds, ac=1, **{"b:a": "64k"}
+        ).overwrite_output().run(quiet=True)
+
+
+def make_backgrounds() -> None:
+    """Generates a synthetic background video and audio and makes the bot take them from there.
+
+    They are kept with the other fixtures, away from the backgrounds the bot downloaded.
+    """
+    background.BACKGROUNDS_DIR = BACKGROUNDS_DIR
+    video_path = f"{BACKGROUNDS_DIR}/video/{BACKGROUND_CREDIT}-background.mp4"
+    audio_path = f"{BACKGROUNDS_DIR}/audio/{BACKGROUND_CREDIT}-background.mp3"
+    Path(video_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(audio_path).parent.mkdir(parents=True, exist_ok=True)
+    if not Path(video_path).is_file():
+        ffmpeg.input("testsrc2=size=1080x1920:rate=30", f="lavfi").output(
+            video_path,
+            t=BACKGROUND_SECONDS,
+            **{"c:v": "libx264", "preset": "ultrafast", "crf": 28},
+        ).overwrite_output().run(quiet=True)
+    if not Path(audio_path).is_file():
+        ffmpeg.input("sine=frequency=330:sample_rate=44100", f="lavfi").output(
+            audio_path, t=BACKGROUND_SECONDS, **{"b:a": "128k"}
+        ).overwrite_output().run(quiet=True)
+
+
+def make_screenshots(reddit_object: dict, count: int) -> None:
+    """Draws comment cards where the screenshots of the browser would be saved."""
+    png_dir = f"assets/temp/{reddit_object['thread_id']}/png"
+    Path(png_dir).mkdir(parents=True, exist_ok=True)
+    font = ImageFont.truetype("fonts/Roboto-Regular.ttf", 28)
+    for idx, comment in enumerate(reddit_object["comments"][: count + 1]):
+        body = comment["comment_body"]
+        lines = [body[i : i + 60] for i in range(0, len(body), 60)]
+        card = Image.new("RGBA", (900, 80 + 40 * len(lines)), BACKGROUND_COLOR)
+        draw = ImageDraw.Draw(card)
+        draw.text((30, 20), f"u/benchmark_user_{idx}", font=font, fill=(129, 131, 132))
+        for line_number, line in enumerate(lines):
+            draw.text((30, 60 + 40 * line_number), line, font=font, fill=TEXT_COLOR)
+        card.save(f"{png_dir}/comment_{idx}.png")
@@ -0,0 +1,106 @@
+"""Measures how long importing main.py takes and fails when it goes over budget.
+
+Usage (from the repository root):
+    python -m benchmarks.import_time [--budget-ms 1000] [--repeat 5]
+
+The import runs with python -X importtime in a fresh interpreter, the median of --repeat runs is
+compared to the budget. It also fails when a module that has to stay lazy is imported, those are
+only loaded once the config asks for them.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+DEFAULT_BUDGET_MS = 1000
+
+# Only loaded by the features that need them, e.g. the AI similarity sort or the chosen TTS
+LAZY_MODULES = (
+    "torch",
+    "transformers",
+    "spacy",
+    "playwright",
+    "yt_dlp",
+    "moviepy",
+    "translators",
+    "boto3",
+    "elevenlabs",
+    "gtts",
+    "pyttsx3",
+)
+
+
+def measure_import(module: str) -> Tuple[float, Dict[str, Tuple[float, float]]]:
+    """Imports the module in a new interpreter.
+
+    Returns:
+        Tuple[float, Dict[str, Tuple[float, float]]]: The milliseconds the import took, and the
+        (self, cumulative) milliseconds of every module it imported
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{process.stderr}")
+    modules = {}
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    return modules[module][1], modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check the import time of main.py.")
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=5, help="Imports, the median is kept")
+    args = parser.parse_args()
+
+    # The first import also writes the bytecode caches, it is not counted
+    measure_import(args.module)
+    runs: List[float] = []
+    for _ in range(max(1, args.repeat)):
+        total, modules = measure_import(args.module)
+        runs.append(total)
+    median = statistics.median(runs)
+
+    table = Table(title=f"Slowest imports of {args.module} (last run)")
+    table.add_column("Module")
+    table.add_column("Self (ms)", justify="right")
+    table.add_column("Cumulative (ms)", justify="right")
+    top_level = {name: times for name, times in modules.items() if "." not in name}
+    for name, (self_ms, cumulative_ms) in sorted(
+        top_level.items(), key=lambda item: item[1][1], reverse=True
+    )[:15]:
+        table.add_row(name, f"{self_ms:.1f}", f"{cumulative_ms:.1f}")
+    console.print(table)
+
+    failed = False
+    eager = [name for name in LAZY_MODULES if name in modules]
+    if eager:
+        console.print(f"[bold red]Imported modules that have to stay lazy: {', '.join(eager)}")
+        failed = True
+    style = "bold green"
+    if median > args.budget_ms:
+        style = "bold red"
+        failed = True
+    console.print(
+        f"[{style}]import {args.module}: {median:.0f} ms median of {len(runs)} runs,"
+        f" budget {args.budget_ms:.0f} ms"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""Times the stages of the pipeline end to end offline, and keeps the results of every commit.
+
+Reddit, the TTS provider, the browser and the background downloads are replaced by the fixtures
+in benchmarks/fixtures.py. TTSEngine.run, imagemaker, chop_background, make_final_video and
+captionGen.main are timed separately, each result is the median of --repeat runs.
+
+Usage (from the repository root):
+    python -m benchmarks.pipeline [--repeat 3] [--results path]
+
+Every run is appended to the results file with the commit it was made on, and compared to the
+last run on another commit. captionGen.main is skipped unless vosk and its model are installed.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import time
+from typing import Callable, Dict, List, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+from benchmarks.fixtures import (
+    BACKGROUND_COLOR,
+    BACKGROUND_CONFIG,
+    BENCHMARK_DIR,
+    TEXT_COLOR,
+    StubTTS,
+    load_reddit_object,
+    make_backgrounds,
+    make_screenshots,
+    make_stub_clips,
+    use_benchmark_config,
+)
+from TTS.engine_wrapper import TTSEngine
+from utils.imagenarator import imagemaker
+from video_creation.background import chop_background
+from video_creation.final_video import make_final_video
+
+console = Console()
+
+DEFAULT_RESULTS_PATH = f"{BENCHMARK_DIR}/pipeline.jsonl"
+VIDEOS_JSON = "video_creation/data/videos.json"
+VOSK_MODEL = "vosk-model-en-us-0.22"
+
+
+def get_commit() -> Dict[str, object]:
+    """Returns the current commit and whether the tree has uncommitted changes."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": True}
+    return {"commit": commit, "dirty": bool(status.strip())}
+
+
+def timed(func: Callable, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def captions_available() -> bool:
+    """captionGen downloads its speech model on first use, the benchmark never does."""
+    try:
+        import vosk  # noqa: F401
+    except ImportError:
+        return False
+    return os.path.exists(VOSK_MODEL)
+
+
+def run_once(timings: Dict[str, List[float]], with_captions: bool) -> None:
+    reddit_object = load_reddit_object()
+    shutil.rmtree(f"assets/temp/{reddit_object['thread_id']}", ignore_errors=True)
+
+    seconds, (length, number_of_comments) = timed(TTSEngine(StubTTS, reddit_object).run)
+    timings["TTSEngine.run"].append(seconds)
+
+    # Storymode draws the post instead of taking screenshots of it
+    os.makedirs(f"assets/temp/{reddit_object['thread_id']}/png", exist_ok=True)
+    seconds, _ = timed(
+        imagemaker, theme=BACKGROUND_COLOR, reddit_obj=reddit_object, txtclr=TEXT_COLOR
+    )
+    timings["imagemaker"].append(seconds)
+
+    make_screenshots(reddit_object, number_of_comments)
+    length = int(length) + 1
+    seconds, _ = timed(chop_background, BACKGROUND_CONFIG, length, reddit_object)
+    timings["chop_background"].append(seconds)
+
+    seconds, outputs = timed(
+        make_final_video, number_of_comments, length, reddit_object, BACKGROUND_CONFIG
+    )
+    timings["make_final_video"].append(seconds)
+
+    if with_captions:
+        import captionGen
+
+        seconds, _ = timed(
+            captionGen.main,
+            outputs["video"],
+            f"{BENCHMARK_DIR}/captioned.mp4",
+            "fonts/Rubik-Black.ttf",
+        )
+        timings["captionGen.main"].append(seconds)
+    os.remove(outputs["video"])
+
+
+def load_previous(path: str, commit: str) -> Optional[dict]:
+    """Returns the last result recorded on another commit."""
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            result = json.loads(line)
+            if result["commit"] != commit:
+                previous = result
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline offline.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage, the median is kept")
+    parser.add_argument(
+        "--results", default=DEFAULT_RESULTS_PATH, help="File to add the results to"
+    )
+    args = parser.parse_args()
+
+    use_benchmark_config()
+    make_stub_clips()
+    make_backgrounds()
+    with_captions = captions_available()
+    if not with_captions:
+        console.print(f"Skipping captionGen.main, vosk or ./{VOSK_MODEL} is not installed.")
+
+    # make_final_video records every video as done, the benchmark runs must not show up there
+    with open(VIDEOS_JSON, encoding="utf-8") as f:
+        videos = f.read()
+    timings: Dict[str, List[float]] = {
+        name: []
+        for name in ("TTSEngine.run", "imagemaker", "chop_background", "make_final_video")
+    }
+    if with_captions:
+        timings["captionGen.main"] = []
+    try:
+        for _ in range(max(1, args.repeat)):
+            run_once(timings, with_captions)
+    finally:
+        with open(VIDEOS_JSON, "w", encoding="utf-8") as f:
+            f.write(videos)
+
+    result = {
+        **get_commit(),
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": max(1, args.repeat),
+        "seconds": {name: statistics.median(values) for name, values in timings.items()},
+    }
+    previous = load_previous(args.results, result["commit"])
+    os.makedirs(os.path.dirname(args.results) or ".", exist_ok=True)
+    with open(args.results, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+
+    title = f"Pipeline on {result['commit']}{' (uncommitted changes)' if result['dirty'] else ''}"
+    table = Table(title=title)
+    table.add_column("Stage")
+    table.add_column("Median (s)", justify="right")
+    if previous:
+        table.add_column(f"{previous['commit']} (s)", justify="right")
+        table.add_column("Change", justify="right")
+    for name, seconds in result["seconds"].items():
+        row = [name, f"{seconds:.3f}"]
+        if previous:
+            before = previous["seconds"].get(name)
+            if before:
+                change = (seconds - before) / before * 100
+                text = f"{change:+.1f}%"
+                if abs(change) > 10:
+                    style = "red" if change > 0 else "green"
+                    text = f"[{style}]{text}[/{style}]"
+                row += [f"{before:.3f}", text]
+            else:
+                row += ["-", "-"]
+        table.add_row(*row)
+    console.print(table)
+    console.print(f"Results added to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
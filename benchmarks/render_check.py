@@ -0,0 +1,109 @@
+"""Renders the fixture thread in every output mode and checks the files ffmpeg wrote.
+
+Usage (from the repository root):
+    python -m benchmarks.render_check
+
+Covers the plain render, the OnlyTTS video written next to it by the tee muxer
+(enable_extra_audio) and the render in segments. Every output needs a video and an audio stream
+about as long as the video. Exits with 1 when one doesn't.
+"""
+import os
+import shutil
+import sys
+from typing import Dict, List, Set, Tuple
+
+import ffmpeg
+from rich.console import Console
+
+from benchmarks.fixtures import (
+    BACKGROUND_CONFIG,
+    StubTTS,
+    load_reddit_object,
+    make_backgrounds,
+    make_screenshots,
+    make_stub_clips,
+    use_benchmark_config,
+)
+from TTS.engine_wrapper import TTSEngine
+from utils import settings
+from video_creation.background import chop_background
+from video_creation.final_video import make_final_video
+
+console = Console()
+
+VIDEOS_JSON = "video_creation/data/videos.json"
+# Seconds an output may be longer or shorter than the video
+DURATION_TOLERANCE = 0.5
+
+# The config overrides of every mode, and the outputs make_final_video has to return for it
+MODES: Dict[str, Tuple[Dict[str, object], Set[str]]] = {
+    "single": ({}, {"video"}),
+    "only tts": ({"settings.background.enable_extra_audio": True}, {"video", "only_tts"}),
+    "segments": ({"settings.render.segment_workers": 2}, {"video"}),
+}
+
+
+def check_output(path: str, length: float) -> List[str]:
+    """Returns what is wrong with a rendered file, nothing if it is fine."""
+    if not os.path.isfile(path):
+        return [f"{path} was not written"]
+    probe = ffmpeg.probe(path)
+    problems = []
+    for kind in ("video", "audio"):
+        if not any(stream["codec_type"] == kind for stream in probe["streams"]):
+            problems.append(f"{path} has no {kind} stream")
+    duration = float(probe["format"]["duration"])
+    if abs(duration - length) > DURATION_TOLERANCE:
+        problems.append(f"{path} is {duration:.2f} s long instead of {length} s")
+    return problems
+
+
+def render(overrides: Dict[str, object], expected: Set[str]) -> List[str]:
+    """Makes the video of the fixture thread with the overrides and checks its outputs."""
+    reddit_object = load_reddit_object()
+    shutil.rmtree(f"assets/temp/{reddit_object['thread_id']}", ignore_errors=True)
+    length, number_of_comments = TTSEngine(StubTTS, reddit_object).run()
+    make_screenshots(reddit_object, number_of_comments)
+    length = int(length) + 1
+    chop_background(BACKGROUND_CONFIG, length, reddit_object)
+
+    restore = settings.apply_overrides(overrides)
+    try:
+        outputs = make_final_video(number_of_comments, length, reddit_object, BACKGROUND_CONFIG)
+    except SystemExit:
+        return ["ffmpeg failed, see its output above"]
+    finally:
+        restore()
+    problems = [f"no {kind} output" for kind in sorted(expected - set(outputs))]
+    for path in outputs.values():
+        problems += check_output(path, length)
+        if os.path.isfile(path):
+            os.remove(path)
+    return problems
+
+
+def main() -> int:
+    use_benchmark_config()
+    make_stub_clips()
+    make_backgrounds()
+    # make_final_video records every video as done, the checks must not show up there
+    with open(VIDEOS_JSON, encoding="utf-8") as f:
+        videos = f.read()
+    failed = False
+    try:
+        for name, (overrides, expected) in MODES.items():
+            console.print(f"[bold]Rendering {name}")
+            problems = render(overrides, expected)
+            for problem in problems:
+                console.print(f"[bold red]{name}: {problem}")
+            if not problems:
+                console.print(f"[bold green]{name}: all outputs are fine")
+            failed = failed or bool(problems)
+    finally:
+        with open(VIDEOS_JSON, "w", encoding="utf-8") as f:
+            f.write(videos)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
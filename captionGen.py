@@ -12,6 +12,8 @@ from PIL import Image, ImageDraw, ImageFont
 from vosk import Model, KaldiRecognizer, SetLogLevel
 import argparse
 
+from utils import profiling
+
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -44,6 +46,7 @@ def extract_audio(video_path, audio_path):
         "-ar", "16000",
         audio_path
     ]
+    profiling.count_subprocess()
     subprocess.run(command, check=True)
     logging.info(f"Audio extracted to {audio_path}")
 
@@ -1,19 +1,30 @@
 #!/usr/bin/env python
+import argparse
+import copy
+import glob
+import json
 import math
+import os
+import re
 import sys
-from os import name
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from subprocess import Popen
-from typing import NoReturn
+from typing import Callable, Dict, List, NoReturn, Optional, Sequence
 
 from prawcore import ResponseException
 
 from reddit.subreddit import get_subreddit_threads
 from utils import settings
+from utils.checkpoint import Checkpoint, checkpointed, fingerprint
 from utils.cleanup import cleanup
 from utils.console import print_markdown, print_step, print_substep
 from utils.ffmpeg_install import ffmpeg_install
 from utils.id import id
+from utils.job_queue import Job, JobQueue
+from utils.progress import RenderProgress, add_progress_listener, remove_progress_listener
+from utils.stages import StageScheduler
 from utils.version import checkversion
 from video_creation.background import (
     chop_background,
@@ -22,7 +33,7 @@ from video_creation.background import (
     get_background_config,
 )
 from video_creation.final_video import make_final_video
-from video_creation.screenshot_downloader import get_screenshots_of_reddit_posts
+from video_creation.screenshot_downloader import BrowserSession, get_screenshots_of_reddit_posts
 from video_creation.voices import save_text_to_mp3
 
 __VERSION__ = "3.3.0"
@@ -40,45 +51,440 @@ print(
 print_markdown(
     "### Thanks for using this tool! Feel free to contribute to this project on GitHub! If you have any questions, feel free to join my Discord server or submit a GitHub issue. You can find solutions to many common problems in the documentation: https://reddit-video-maker-bot.netlify.app/"
 )
-checkversion(__VERSION__)
-
-
-def main(POST_ID=None) -> None:
-    global redditid, reddit_object
-    reddit_object = get_subreddit_threads(POST_ID)
-    redditid = id(reddit_object)
-    length, number_of_comments = save_text_to_mp3(reddit_object)
-    length = math.ceil(length)
-    get_screenshots_of_reddit_posts(reddit_object, number_of_comments)
-    bg_config = {
-        "video": get_background_config("video"),
-        "audio": get_background_config("audio"),
+
+
+def add_video_stages(
+    scheduler: StageScheduler,
+    POST_ID=None,
+    prefix: str = "",
+    after: Dict[str, Sequence[str]] = None,
+    browser_session: BrowserSession = None,
+    resume: bool = False,
+    locks: Dict[str, threading.Lock] = None,
+    in_flight: "VideosInFlight" = None,
+) -> Dict[str, str]:
+    """Adds the stages making one video to the scheduler.
+
+    The stages record what they made in the checkpoint of the thread, see utils.checkpoint.
+
+    Args:
+        scheduler (StageScheduler): The scheduler to add the stages to
+        POST_ID (str): The thread to make the video of, picked from the subreddit when not given
+        prefix (str): Put in front of the stage names, keeps the stages of several videos apart
+        after (Dict[str, Sequence[str]]): Extra stages every stage has to wait for, by stage name
+        browser_session (BrowserSession): Browser shared by the screenshots of several videos
+        resume (bool): Skip the stages whose checkpoint of POST_ID is still valid
+        locks (Dict[str, threading.Lock]): Locks held while a stage runs, by stage name. They keep
+            the stages of videos in other schedulers from running at the same time
+        in_flight (VideosInFlight): Holds the thread while its video is being made
+
+    Returns:
+        Dict[str, str]: The names of the added stages in the scheduler, by stage name
+    """
+    after = after or {}
+    locks = locks or {}
+    names = {}
+
+    def add(name, func, depends_on=(), **checkpoint):
+        names[name] = prefix + name
+        if checkpoint:
+            func = checkpointed(name, func, resume, depends_on=depends_on, **checkpoint)
+        if name in locks:
+            func = holding(locks[name], func)
+        scheduler.add(
+            names[name],
+            func,
+            depends_on=[names[dependency] for dependency in depends_on] + list(after.get(name, ())),
+        )
+
+    def fetch(*_):
+        record = None
+        if resume:
+            record = Checkpoint.of(POST_ID).get("fetch", fingerprint("fetch", POST_ID))
+        if record is not None:
+            print_substep("Resuming: fetch is already done.", style="bold blue")
+            reddit_object, bg_config = record["result"]
+        else:
+            reddit_object = get_subreddit_threads(POST_ID)
+            bg_config = {
+                "video": get_background_config("video"),
+                "audio": get_background_config("audio"),
+            }
+            thread_id = reddit_object["thread_id"]
+            # A copy, the TTS edits the comments of reddit_object while later stages are recorded
+            Checkpoint.of(thread_id).record(
+                "fetch",
+                fingerprint("fetch", thread_id),
+                [],
+                copy.deepcopy([reddit_object, bg_config]),
+            )
+        if in_flight is not None:
+            in_flight.add(id(reddit_object))
+        return reddit_object, bg_config
+
+    def tts(thread, *_):
+        length, number_of_comments = save_text_to_mp3(thread[0])
+        return math.ceil(length), number_of_comments
+
+    def screenshots(thread, *_):
+        get_screenshots_of_reddit_posts(
+            thread[0],
+            lambda: scheduler.peek(names["tts"], (None, None))[1],
+            browser_session=browser_session,
+        )
+
+    def has_screenshots(_, thread, *__) -> bool:
+        if settings.config["settings"]["storymode"]:
+            return True
+        # Only as many comments as the TTS read are screenshotted
+        tts_result = scheduler.wait_for(names["tts"])
+        return tts_result is not None and all(
+            os.path.exists(temp_path(thread, f"png/comment_{idx}.png"))
+            for idx in range(tts_result[1])
+        )
+
+    # The screenshots start right away and stop at the number of comments the TTS settles on
+    add("fetch", fetch)
+    add(
+        "tts",
+        tts,
+        depends_on=("fetch",),
+        config=(
+            "settings.tts",
+            "settings.storymode",
+            "settings.storymodemethod",
+            "reddit.thread.post_lang",
+        ),
+        outputs=lambda _, thread: temp_files(thread, "mp3/*"),
+    )
+    add(
+        "screenshots",
+        screenshots,
+        depends_on=("fetch",),
+        config=(
+            "settings.theme",
+            "settings.zoom",
+            "settings.screenshot_method",
+            "settings.resolution_w",
+            "settings.resolution_h",
+            "settings.storymode",
+            "settings.storymodemethod",
+            "reddit.thread.post_lang",
+        ),
+        # The final video adds its own images next to the screenshots
+        outputs=lambda _, thread: temp_files(thread, "png/comment_*.png")
+        + temp_files(thread, "png/story_content*.png")
+        + temp_files(thread, "png/img*.png"),
+        resumable=has_screenshots,
+    )
+    add(
+        "background video",
+        lambda thread, *_: download_background_video(thread[1]["video"]),
+        depends_on=("fetch",),
+    )
+    add(
+        "background audio",
+        lambda thread, *_: download_background_audio(thread[1]["audio"]),
+        depends_on=("fetch",),
+    )
+    add(
+        "chop background",
+        lambda thread, tts_result, *_: chop_background(thread[1], tts_result[0], thread[0]),
+        depends_on=("fetch", "tts", "background video", "background audio"),
+        config=("settings.background",),
+        outputs=lambda _, thread, *__: temp_files(thread, "background.mp*"),
+    )
+    def final_video(thread, tts_result, *_):
+        outputs = make_final_video(tts_result[1], tts_result[0], thread[0], thread[1])
+        # make_final_video already cleaned up the temp files and the checkpoint with them
+        Checkpoint.discard(thread[0]["thread_id"])
+        if in_flight is not None:
+            in_flight.remove(re.sub(r"[^\w\s-]", "", thread[0]["thread_id"]))
+        return outputs
+
+    # Not checkpointed, there is nothing left to resume once the video is done
+    add(
+        "final video",
+        final_video,
+        depends_on=("fetch", "tts", "screenshots", "chop background"),
+    )
+    return names
+
+
+def holding(lock: threading.Lock, func: Callable) -> Callable:
+    """Returns func running with the lock held."""
+
+    def run(*args):
+        with lock:
+            return func(*args)
+
+    return run
+
+
+def temp_path(thread, path: str) -> str:
+    """Returns the path of a file in the temp folder of the thread of a stage."""
+    reddit_id = re.sub(r"[^\w\s-]", "", thread[0]["thread_id"])
+    return f"assets/temp/{reddit_id}/{path}"
+
+
+def temp_files(thread, pattern: str) -> List[str]:
+    """Returns the files matching a glob pattern in the temp folder of the thread of a stage."""
+    return sorted(glob.glob(temp_path(thread, pattern)))
+
+
+class VideosInFlight:
+    """The threads whose videos were fetched and are not finished yet.
+
+    Lets a run that stops keep the temp files of every unfinished video that can be resumed and
+    clean up the others.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread_ids: List[str] = []
+
+    def add(self, thread_id: str) -> None:
+        with self.lock:
+            if thread_id not in self.thread_ids:
+                self.thread_ids.append(thread_id)
+
+    def remove(self, thread_id: str) -> None:
+        with self.lock:
+            if thread_id in self.thread_ids:
+                self.thread_ids.remove(thread_id)
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.thread_ids))
+
+
+def main(POST_ID=None, resume: bool = False, in_flight: VideosInFlight = None) -> None:
+    scheduler = StageScheduler()
+    add_video_stages(scheduler, POST_ID, resume=resume, in_flight=in_flight)
+    try:
+        scheduler.run()
+    finally:
+        scheduler.print_summary()
+
+
+def run_batch(post_ids: List[Optional[str]], in_flight: VideosInFlight = None) -> None:
+    """Makes a video of every given thread, a None picks the next thread from the subreddit.
+
+    The Reddit client, the logged in browser, the TTS clients and the AI models are set up once
+    and shared by all videos. Up to settings.videos_in_flight videos are worked on at the same
+    time, e.g. the next thread is scraped, read and screenshotted while the current one renders.
+    The threads are fetched, the backgrounds downloaded and the videos rendered one at a time.
+    """
+    videos_in_flight = settings.config["settings"]["videos_in_flight"]
+    browser_session = BrowserSession()
+    scheduler = StageScheduler("batch")
+    videos = []
+    for x, post_id in enumerate(post_ids):
+        after = {}
+        if videos:
+            previous = videos[-1]
+            after = {
+                "fetch": [previous["fetch"]],
+                "background video": [previous["background video"]],
+                "background audio": [previous["background audio"]],
+                "final video": [previous["final video"]],
+            }
+            if len(videos) >= videos_in_flight:
+                after["fetch"].append(videos[-videos_in_flight]["final video"])
+        videos.append(
+            add_video_stages(
+                scheduler,
+                post_id,
+                prefix=f"video {x + 1}: ",
+                after=after,
+                browser_session=browser_session,
+                in_flight=in_flight,
+            )
+        )
+    print_step(f"Making {len(post_ids)} videos, {videos_in_flight} at a time")
+    try:
+        scheduler.run()
+    finally:
+        scheduler.print_summary()
+        browser_session.close()
+
+
+def run_many(times, in_flight: VideosInFlight = None) -> None:
+    run_batch([None] * times, in_flight)
+
+
+class OverrideGate:
+    """Lets jobs run together only when they override the config in the same way.
+
+    The config is shared by the whole process, so the overrides of a job are applied while the
+    first job with them starts and restored when the last of them finishes.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.active = None
+        self.running = 0
+        self.restore = None
+
+    @contextmanager
+    def enter(self, overrides: Dict[str, object]):
+        key = json.dumps(overrides, sort_keys=True)
+        with self.condition:
+            self.condition.wait_for(lambda: self.running == 0 or self.active == key)
+            if self.running == 0:
+                self.active = key
+                self.restore = settings.apply_overrides(overrides)
+            self.running += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.running -= 1
+                if self.running == 0:
+                    self.restore()
+                    self.active = None
+                self.condition.notify_all()
+
+
+def run_daemon(
+    workers: int = 1, poll_interval: float = 5.0, in_flight: VideosInFlight = None
+) -> NoReturn:
+    """Makes the videos of the job queue until stopped.
+
+    The Reddit client, the logged in browser, the TTS clients and the AI models stay loaded
+    between jobs. The progress of the renders and the paths of the finished videos are written
+    to the job records.
+
+    Args:
+        workers (int): How many jobs are worked on at the same time
+        poll_interval (float): Seconds between looks at the queue while it is empty
+        in_flight (VideosInFlight): Collects the threads of the unfinished jobs
+    """
+    queue = JobQueue()
+    requeued = queue.requeue_running()
+    if requeued:
+        print_substep(f"Requeued {requeued} jobs that were running when the daemon stopped.")
+    browser_session = BrowserSession()
+    gate = OverrideGate()
+    # Like the chained stages of run_batch: one thread is fetched, one background downloaded and
+    # one video rendered at a time, whichever job it belongs to
+    locks = {
+        name: threading.Lock()
+        for name in ("fetch", "background video", "background audio", "final video")
     }
-    download_background_video(bg_config["video"])
-    download_background_audio(bg_config["audio"])
-    chop_background(bg_config, length, reddit_object)
-    make_final_video(number_of_comments, length, reddit_object, bg_config)
 
+    def run_job(job: Job) -> Dict[str, str]:
+        with gate.enter(job.overrides):
+            scheduler = StageScheduler(f"job {job.id}")
+            names = add_video_stages(
+                scheduler,
+                job.post_id,
+                prefix=f"job {job.id}: ",
+                browser_session=browser_session,
+                locks=locks,
+                in_flight=in_flight,
+            )
+            reported = [None]
+
+            def on_progress(progress: RenderProgress) -> None:
+                # Every render reports to every listener, the job's is the one of its thread
+                thread = scheduler.peek(names["fetch"])
+                if thread is None:
+                    return
+                if progress.render_id != re.sub(r"[^\w\s-]", "", thread[0]["thread_id"]):
+                    return
+                # Written at whole percents, not at every report of ffmpeg
+                percent = int(progress.progress * 100)
+                if percent != reported[0]:
+                    reported[0] = percent
+                    queue.update_progress(job.id, percent / 100)
+
+            add_progress_listener(on_progress)
+            try:
+                results = scheduler.run()
+            finally:
+                remove_progress_listener(on_progress)
+                scheduler.print_summary()
+        return {
+            kind: os.path.abspath(path) for kind, path in results[names["final video"]].items()
+        }
+
+    def work():
+        while True:
+            job = queue.claim()
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+            print_step(f"Job {job.id}: making a video of {job.post_id or 'the next thread'}")
+            try:
+                outputs = run_job(job)
+            except (Exception, SystemExit) as err:
+                # A failed job must not take its worker down with it
+                print_substep(f"Job {job.id} failed: {err!r}", style="bold red")
+                queue.fail(job.id, repr(err))
+                continue
+            queue.finish(job.id, outputs)
+            print_substep(f"Job {job.id} finished: {outputs['video']}", style="bold green")
+
+    print_step(f"Waiting for jobs in {queue.path} with {workers} workers")
+    threads = [
+        threading.Thread(target=work, name=f"Worker-{i}", daemon=True) for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            # Joining with a timeout keeps the main thread responsive to Ctrl+C
+            for thread in threads:
+                thread.join(timeout=1)
+    finally:
+        browser_session.close()
+
+
+def print_resume_hint(thread_id: str) -> bool:
+    """Tells how to pick up the video of a thread where it stopped, if it got far enough to."""
+    if not Checkpoint.of(thread_id).exists():
+        return False
+    print_substep(
+        f"Keeping the temp files, continue with: python main.py --resume {thread_id}",
+        style="bold blue",
+    )
+    return True
 
-def run_many(times) -> None:
-    for x in range(1, times + 1):
-        print_step(
-            f'on the {x}{("th", "st", "nd", "rd", "th", "th", "th", "th", "th", "th")[x % 10]} iteration of {times}'
-        )  # correct 1st 2nd 3rd 4th 5th....
-        main()
-        Popen("cls" if name == "nt" else "clear", shell=True).wait()
 
+def print_resume_hints(in_flight: VideosInFlight) -> None:
+    for thread_id in in_flight:
+        print_resume_hint(thread_id)
 
-def shutdown() -> NoReturn:
-    if "redditid" in globals():
+
+def shutdown(in_flight: VideosInFlight) -> NoReturn:
+    # The videos that can't be resumed start over, their temp files are not needed anymore
+    cleared = [thread_id for thread_id in in_flight if not print_resume_hint(thread_id)]
+    if cleared:
         print_markdown("## Clearing temp files")
-        cleanup(redditid)
+        for thread_id in cleared:
+            cleanup(thread_id)
 
     print("Exiting...")
     sys.exit()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Makes videos of Reddit threads.")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and make the videos added with python -m utils.job_queue enqueue",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="How many jobs the daemon works on at the same time"
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="THREAD_ID",
+        help="Continue the video of a thread that stopped, skipping the stages that are done",
+    )
+    args = parser.parse_args()
     if sys.version_info.major != 3 or sys.version_info.minor not in [10, 11, 12]:
         print(
             "Hey! Congratulations, you've made it so far (which is pretty rare with no Python 3.10). Unfortunately, this program only works on Python 3.10. Please install Python 3.10 and try again."
@@ -90,6 +496,8 @@ if __name__ == "__main__":
         f"{directory}/utils/.config.template.toml", f"{directory}/config.toml"
     )
     config is False and sys.exit()
+    if config["settings"]["check_for_updates"]:
+        checkversion(__VERSION__)
 
     if (
         not settings.config["settings"]["tts"]["tiktok_sessionid"]
@@ -100,25 +508,28 @@ if __name__ == "__main__":
             "bold red",
         )
         sys.exit()
+    in_flight = VideosInFlight()
     try:
-        if config["reddit"]["thread"]["post_id"]:
-            for index, post_id in enumerate(config["reddit"]["thread"]["post_id"].split("+")):
-                index += 1
-                print_step(
-                    f'on the {index}{("st" if index % 10 == 1 else ("nd" if index % 10 == 2 else ("rd" if index % 10 == 3 else "th")))} post of {len(config["reddit"]["thread"]["post_id"].split("+"))}'
-                )
-                main(post_id)
-                Popen("cls" if name == "nt" else "clear", shell=True).wait()
-        elif config["settings"]["times_to_run"]:
-            run_many(config["settings"]["times_to_run"])
+        if args.daemon:
+            run_daemon(max(1, args.workers), in_flight=in_flight)
+        elif args.resume:
+            main(args.resume, resume=True, in_flight=in_flight)
+        elif config["reddit"]["thread"]["post_id"]:
+            post_ids = config["reddit"]["thread"]["post_id"].split("+")
+            if len(post_ids) == 1:
+                main(post_ids[0], in_flight=in_flight)
+            else:
+                run_batch(post_ids, in_flight)
+        elif config["settings"]["times_to_run"] and config["settings"]["times_to_run"] > 1:
+            run_many(config["settings"]["times_to_run"], in_flight)
         else:
-            main()
+            main(in_flight=in_flight)
     except KeyboardInterrupt:
-        shutdown()
+        shutdown(in_flight)
     except ResponseException:
         print_markdown("## Invalid credentials")
         print_markdown("Please check your credentials in the config.toml file")
-        shutdown()
+        shutdown(in_flight)
     except Exception as err:
         config["settings"]["tts"]["tiktok_sessionid"] = "REDACTED"
         config["settings"]["tts"]["elevenlabs_api_key"] = "REDACTED"
@@ -128,4 +539,5 @@ if __name__ == "__main__":
             f"Error: {err} \n"
             f'Config: {config["settings"]}'
         )
+        print_resume_hints(in_flight)
         raise err
@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 
 import praw
 from praw.models import MoreComments
@@ -13,14 +14,11 @@ from utils.videos import check_done
 from utils.voice import sanitize_text
 
 
-def get_subreddit_threads(POST_ID: str):
-    """
-    Returns a list of threads from the AskReddit subreddit.
-    """
-
+@lru_cache(maxsize=None)
+def get_reddit_client() -> praw.Reddit:
+    """Logs into Reddit once, the client is reused for every following thread."""
     print_substep("Logging into Reddit.")
 
-    content = {}
     if settings.config["reddit"]["creds"]["2fa"]:
         print("\nEnter your two-factor authentication code from your authenticator app.\n")
         code = input("> ")
@@ -44,8 +42,20 @@ def get_subreddit_threads(POST_ID: str):
     except ResponseException as e:
         if e.response.status_code == 401:
             print("Invalid credentials - please check them in config.toml")
+        raise
     except:
         print("Something went wrong...")
+        raise
+    return reddit
+
+
+def get_subreddit_threads(POST_ID: str):
+    """
+    Returns a list of threads from the AskReddit subreddit.
+    """
+
+    reddit = get_reddit_client()
+    content = {}
 
     # Ask user for subreddit input
     print_step("Getting subreddit threads...")
@@ -121,6 +131,9 @@ def get_subreddit_threads(POST_ID: str):
     content["thread_title"] = submission.title
     content["thread_id"] = submission.id
     content["is_nsfw"] = submission.over_18
+    content["thread_author"] = submission.author.name if submission.author else "[deleted]"
+    content["thread_score"] = submission.score
+    content["subreddit"] = submission.subreddit.display_name
     content["comments"] = []
     if settings.config["settings"]["storymode"]:
         if settings.config["settings"]["storymodemethod"] == 1:
@@ -153,6 +166,8 @@ def get_subreddit_threads(POST_ID: str):
                                     "comment_body": top_level_comment.body,
                                     "comment_url": top_level_comment.permalink,
                                     "comment_id": top_level_comment.id,
+                                    "comment_author": top_level_comment.author.name,
+                                    "comment_score": top_level_comment.score,
                                 }
                             )
 
@@ -1,10 +1,13 @@
+from functools import lru_cache
+
 import numpy as np
-import torch
-from transformers import AutoModel, AutoTokenizer
 
+# torch and transformers take seconds to import, they are only loaded when the similarity sort is on
 
 # Mean Pooling - Take attention mask into account for correct averaging
 def mean_pooling(model_output, attention_mask):
+    import torch
+
     token_embeddings = model_output[0]  # First element of model_output contains all token embeddings
     input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
     return torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(
@@ -12,11 +15,22 @@ def mean_pooling(model_output, attention_mask):
     )
 
 
+# The model is loaded once and reused for every following sort
+@lru_cache(maxsize=None)
+def load_similarity_model():
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
+    model = AutoModel.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
+    return tokenizer, model
+
+
 # This function sort the given threads based on their total similarity with the given keywords
 def sort_by_similarity(thread_objects, keywords):
+    import torch
+
     # Initialize tokenizer + model.
-    tokenizer = AutoTokenizer.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
-    model = AutoModel.from_pretrained("sentence-transformers/all-MiniLM-L6-v2")
+    tokenizer, model = load_similarity_model()
 
     # Transform the generator to a list of Submission Objects, so we can sort later based on context similarity to
     # keywords
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+# Assets that are expensive to make and can be shared between comments and runs
+ASSET_CACHE_DIR = "assets/cache"
+
+
+def get_cache_dir(name: str) -> str:
+    """Returns assets/cache/<name>, creating it if needed."""
+    path = f"{ASSET_CACHE_DIR}/{name}"
+    Path(path).mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class ContentCache:
+    """Files stored under the hash of what they were made from, in assets/cache/<name>.
+
+    The least recently used files are deleted once the cache grows past max_bytes. Hits are
+    hardlinked to their destination when possible and copied otherwise.
+
+    Args:
+        name (str): Directory of the cache in assets/cache
+        max_bytes (int): Size limit of the cache
+        suffix (str): Extension of the cached files
+    """
+
+    def __init__(self, name: str, max_bytes: int, suffix: str = ""):
+        self.path = get_cache_dir(name)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.lock = threading.Lock()
+        self.size = None  # total size, counted on the first store
+
+    @staticmethod
+    def key(*parts) -> str:
+        """Hashes the parts a file is made from into its cache key."""
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return f"{self.path}/{key[:2]}/{key}{self.suffix}"
+
+    def fetch(self, key: str, destination: str) -> bool:
+        """Puts the cached file at destination, returns False if it isn't cached."""
+        cached = self.path_for(key)
+        try:
+            # The modification time orders the files for the eviction
+            os.utime(cached)
+        except FileNotFoundError:
+            return False
+        try:
+            link_or_copy(cached, destination)
+        except FileNotFoundError:  # evicted in the meantime
+            return False
+        return True
+
+    def store(self, key: str, source: str) -> None:
+        """Adds a copy of source to the cache and evicts the oldest files if it grew too big."""
+        cached = self.path_for(key)
+        Path(cached).parent.mkdir(parents=True, exist_ok=True)
+        temp = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+        link_or_copy(source, temp)
+        os.replace(temp, cached)
+        with self.lock:
+            if self.size is None:
+                self.size = sum(size for _, size, _ in self.files())
+            else:
+                self.size += os.path.getsize(cached)
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def files(self):
+        """Yields (path, size, mtime) of every cached file."""
+        for directory, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def evict(self) -> None:
+        # Evicting down to 90% of the limit leaves room for the next few files
+        files = sorted(self.files(), key=lambda file: file[2])
+        self.size = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if self.size <= self.max_bytes * 0.9:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
+
+
+def link_or_copy(source: str, destination: str) -> None:
+    """Hardlinks source to destination, or copies it if they are on different file systems."""
+    # Never write through an existing hardlink, it could be a cached file
+    if os.path.lexists(destination):
+        os.unlink(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from utils import settings
+from utils.console import print_substep
+
+CHECKPOINT_NAME = "checkpoint.json"
+
+# Config values that don't change what a stage makes, e.g. API keys rotated between runs
+IGNORED_SETTINGS = ("elevenlabs_api_key", "tiktok_sessionid", "gemini_api_key")
+
+
+def fingerprint(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_config_value(dotted_path: str):
+    """Returns the config value at a dotted path like "settings.tts", without the ignored keys."""
+    value = settings.config
+    for key in dotted_path.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return _without_ignored(value)
+
+
+def _without_ignored(value):
+    if not isinstance(value, dict):
+        return value
+    return {
+        key: _without_ignored(item) for key, item in value.items() if key not in IGNORED_SETTINGS
+    }
+
+
+class Checkpoint:
+    """Records which stages of a video finished, what they were made from and what they wrote.
+
+    The records are kept in assets/temp/<id>/checkpoint.json. A record stays valid as long as the
+    inputs of its stage are the same and every file it wrote is unchanged.
+    """
+
+    _checkpoints: Dict[str, "Checkpoint"] = {}
+    _checkpoints_lock = threading.Lock()
+
+    def __init__(self, reddit_id: str):
+        self.reddit_id = reddit_id
+        self.path = f"assets/temp/{reddit_id}/{CHECKPOINT_NAME}"
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.stages: Dict[str, dict] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.stages = {}
+
+    @classmethod
+    def of(cls, thread_id: str) -> "Checkpoint":
+        """Returns the checkpoint of a thread, shared by all stages of its video."""
+        reddit_id = re.sub(r"[^\w\s-]", "", thread_id)
+        with cls._checkpoints_lock:
+            if reddit_id not in cls._checkpoints:
+                cls._checkpoints[reddit_id] = cls(reddit_id)
+            return cls._checkpoints[reddit_id]
+
+    @classmethod
+    def discard(cls, thread_id: str) -> None:
+        """Forgets the checkpoint of a thread whose temp files were deleted."""
+        with cls._checkpoints_lock:
+            cls._checkpoints.pop(re.sub(r"[^\w\s-]", "", thread_id), None)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def get(self, stage: str, inputs: str) -> Optional[dict]:
+        """Returns the record of a stage if it is still valid for the given inputs."""
+        with self.lock:
+            record = self.stages.get(stage)
+        if record is None or record["inputs"] != inputs:
+            return None
+        for path, digest in record["outputs"].items():
+            try:
+                if file_digest(path) != digest:
+                    return None
+            except FileNotFoundError:
+                return None
+        return record
+
+    def fingerprint_of(self, stage: str) -> Optional[str]:
+        """Identifies what a finished stage made, the stages depending on it hash this."""
+        with self.lock:
+            record = self.stages.get(stage)
+        return record["fingerprint"] if record else None
+
+    def record(self, stage: str, inputs: str, outputs: Sequence[str], result: Any) -> None:
+        digests = {path: file_digest(path) for path in outputs}
+        with self.lock:
+            self.stages[stage] = {
+                "inputs": inputs,
+                "outputs": digests,
+                "result": result,
+                "fingerprint": fingerprint(inputs, digests, result),
+            }
+            self.save()
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp = f"{self.path}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(self.stages, f, ensure_ascii=False, indent=4)
+        os.replace(temp, self.path)
+
+
+def checkpointed(
+    stage: str,
+    func: Callable[..., Any],
+    resume: bool,
+    depends_on: Sequence[str] = (),
+    config: Sequence[str] = (),
+    outputs: Callable[..., List[str]] = lambda result, *args: [],
+    resumable: Callable[..., bool] = lambda result, *args: True,
+) -> Callable[..., Any]:
+    """Wraps the function of a stage so it is recorded in the checkpoint of its thread.
+
+    The wrapped function is called with the (reddit object, background config) of the thread
+    first, like the stages of main.add_video_stages.
+
+    Args:
+        stage (str): Name of the stage in the checkpoint
+        func (Callable): Function running the stage
+        resume (bool): Whether a stage with a valid record is skipped and returns its recorded result
+        depends_on (Sequence[str]): Stages whose records are part of the inputs of this one
+        config (Sequence[str]): Dotted paths of the config values the stage depends on
+        outputs (Callable): Called like func with its result first, returns the files it wrote
+        resumable (Callable): Called like outputs with the recorded result, False re-runs the stage
+    """
+
+    def run(thread, *args):
+        checkpoint = Checkpoint.of(thread[0]["thread_id"])
+        inputs = fingerprint(
+            stage,
+            [get_config_value(path) for path in config],
+            [checkpoint.fingerprint_of(dependency) for dependency in depends_on],
+        )
+        if resume:
+            record = checkpoint.get(stage, inputs)
+            if record is not None and resumable(record["result"], thread, *args):
+                print_substep(f"Resuming: {stage} is already done.", style="bold blue")
+                return record["result"]
+        result = func(thread, *args)
+        checkpoint.record(stage, inputs, outputs(result, thread, *args), result)
+        return result
+
+    return run
@@ -0,0 +1,173 @@
+import html
+import os
+import re
+from typing import Callable, List, Optional, Tuple, Union
+
+from PIL import Image, ImageDraw, ImageFont
+
+from utils import settings
+from utils.console import track
+from utils.fonts import getsize
+
+Color = Tuple[int, ...]
+
+# Sizes are fractions of the card width, so the cards look the same at every resolution
+PADDING = 0.04
+HEADER_SIZE = 0.028
+BODY_SIZE = 0.036
+LINE_SPACING = 1.35
+
+
+def format_score(score: Optional[int]) -> str:
+    """Formats a score like Reddit does, e.g. 1234 -> "1.2k points"."""
+    if score is None:
+        return ""
+    if abs(score) >= 1000:
+        return f"{score / 1000:.1f}k points".replace(".0k", "k")
+    return f"{score} point{'' if score == 1 else 's'}"
+
+
+def wrap_text(text: str, font, width: int) -> List[str]:
+    """Wraps the text to lines no wider than width pixels, keeping its line breaks."""
+    lines = []
+    for paragraph in text.splitlines():
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if line and getsize(font, candidate)[0] > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)  # empty for the blank lines between paragraphs
+    while lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def draw_text(draw, position, text, font, fill, transparent=False) -> None:
+    """Draws the text, with a shadow when it goes over a transparent background."""
+    x, y = position
+    if transparent:
+        for dx, dy in ((-2, -2), (2, -2), (-2, 2), (2, 2)):
+            draw.text((x + dx, y + dy), text, font=font, fill="black")
+    draw.text((x, y), text, font=font, fill=fill)
+
+
+def render_card(
+    header: str,
+    body: str,
+    path: str,
+    width: int,
+    bgcolor: Color,
+    txtcolor: Color,
+    transparent: bool = False,
+) -> None:
+    """Draws a card with a muted header line above the wrapped body text and saves it.
+
+    Args:
+        header (str): e.g. "u/author · 12 points"
+        body (str): Text of the comment or post
+        path (str): Where the PNG is saved
+        width (int): Width of the card in pixels, the height follows from the text
+    """
+    padding = int(width * PADDING)
+    header_font = ImageFont.truetype(
+        os.path.join("fonts", "Roboto-Bold.ttf"), int(width * HEADER_SIZE)
+    )
+    body_font = ImageFont.truetype(
+        os.path.join("fonts", "Roboto-Black.ttf" if transparent else "Roboto-Regular.ttf"),
+        int(width * BODY_SIZE),
+    )
+    line_height = int(body_font.size * LINE_SPACING)
+    lines = wrap_text(body, body_font, width - 2 * padding)
+    header_height = int(header_font.size * LINE_SPACING)
+    height = 2 * padding + header_height + padding // 2 + line_height * len(lines)
+
+    # The header is drawn between the text and the background color
+    muted = tuple((t * 3 + b * 2) // 5 for t, b in zip(txtcolor[:3], bgcolor[:3]))
+    card = Image.new("RGBA", (width, height), bgcolor)
+    draw = ImageDraw.Draw(card)
+    draw_text(draw, (padding, padding), header, header_font, muted, transparent)
+    y = padding + header_height + padding // 2
+    for line in lines:
+        draw_text(draw, (padding, y), line, body_font, txtcolor, transparent)
+        y += line_height
+    card.save(path)
+
+
+def card_width() -> int:
+    """Twice the width the video shows the cards at, like the browser's device scale factor."""
+    return int(settings.config["settings"]["resolution_w"]) * 45 // 100 * 2
+
+
+def make_comment_card(
+    comment: dict, path: str, bgcolor: Color, txtcolor: Color, transparent: bool = False
+) -> None:
+    """Draws one comment as a card saved at path."""
+    # Threads fetched before the author and score were kept still get a card
+    header = f"u/{comment.get('comment_author', '[deleted]')}"
+    score = format_score(comment.get("comment_score"))
+    if score:
+        header += f" · {score}"
+    render_card(
+        header,
+        translate(html.unescape(comment["comment_body"])),
+        path,
+        card_width(),
+        bgcolor,
+        txtcolor,
+        transparent,
+    )
+
+
+def translate(text: str) -> str:
+    lang = settings.config["reddit"]["thread"]["post_lang"]
+    if not lang:
+        return text
+    import translators
+
+    return translators.translate_text(text, translator="google", to_language=lang)
+
+
+def make_comment_cards(
+    reddit_object: dict,
+    screenshot_num: Union[int, Callable[[], Optional[int]]],
+    bgcolor: Color,
+    txtcolor: Color,
+    transparent: bool = False,
+) -> None:
+    """Draws the comments as cards where their screenshots would be saved, without a browser.
+
+    The cards are made from the text, author and score of the comments in reddit_object, so they
+    don't need Reddit to be reachable. In storymode the post text is drawn as story_content.png.
+
+    Args:
+        reddit_object (Dict): Reddit object received from reddit/subreddit.py
+        screenshot_num (int): Number of cards to draw, or a function returning it, see
+            video_creation.screenshot_downloader.get_screenshots_of_reddit_posts
+    """
+    reddit_id = re.sub(r"[^\w\s-]", "", reddit_object["thread_id"])
+
+    if settings.config["settings"]["storymode"]:
+        header = (
+            f"r/{reddit_object.get('subreddit', '')}"
+            f" · u/{reddit_object.get('thread_author', '[deleted]')}"
+        )
+        render_card(
+            header,
+            translate(html.unescape(reddit_object["thread_post"])),
+            f"assets/temp/{reddit_id}/png/story_content.png",
+            card_width(),
+            bgcolor,
+            txtcolor,
+            transparent,
+        )
+        return
+
+    for idx, comment in enumerate(track(reddit_object["comments"], "Drawing comments...")):
+        limit = screenshot_num() if callable(screenshot_num) else screenshot_num
+        if limit is not None and idx >= limit:
+            break
+        path = f"assets/temp/{reddit_id}/png/comment_{idx}.png"
+        make_comment_card(comment, path, bgcolor, txtcolor, transparent)
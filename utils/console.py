@@ -1,10 +1,12 @@
 import re
+import threading
 
 from rich.columns import Columns
 from rich.console import Console
 from rich.markdown import Markdown
 from rich.padding import Padding
 from rich.panel import Panel
+from rich.progress import track as rich_track
 from rich.text import Text
 
 console = Console()
@@ -35,6 +37,25 @@ def print_substep(text, style="") -> None:
     console.print(text, style=style)
 
 
+_progress_bar_lock = threading.Lock()
+
+
+def track(sequence, description="Working...", total=None):
+    """Iterates over a sequence showing a rich progress bar.
+
+    rich can only show one progress bar at a time, so when another stage running on a different
+    thread already shows one the sequence is iterated without a bar.
+    """
+    if not _progress_bar_lock.acquire(blocking=False):
+        print_substep(description)
+        yield from sequence
+        return
+    try:
+        yield from rich_track(sequence, description, total=total)
+    finally:
+        _progress_bar_lock.release()
+
+
 def handle_input(
     message: str = "",
     check_type=False,
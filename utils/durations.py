@@ -0,0 +1,202 @@
+import json
+import struct
+from os.path import exists
+from typing import Dict, Optional, Tuple
+
+import ffmpeg
+
+from utils import profiling
+
+MANIFEST_NAME = "durations.json"
+
+# Bitrates in kbps, indexed by [MPEG-1?][layer][bitrate index]
+MP3_BITRATES: Dict[bool, Dict[int, tuple]] = {
+    True: {
+        1: (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+        2: (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+        3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    },
+    False: {
+        1: (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+        2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+        3: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    },
+}
+# Sample rates indexed by the version bits of the frame header (0b01 is reserved)
+MP3_SAMPLE_RATES: Dict[int, tuple] = {
+    0b00: (11025, 12000, 8000),  # MPEG-2.5
+    0b10: (22050, 24000, 16000),  # MPEG-2
+    0b11: (44100, 48000, 32000),  # MPEG-1
+}
+# Encoders that write a LAME tag with the delay and padding, ffmpeg names it Lavf or Lavc
+LAME_TAG_ENCODERS = (b"LAME", b"Lavf", b"Lavc")
+
+
+def parse_mp3_frame_header(data: bytes, offset: int) -> Optional[dict]:
+    """Parses the MPEG audio frame header at offset, or returns None if there is none."""
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[offset + 1] >> 3) & 0b11
+    layer = 4 - ((data[offset + 1] >> 1) & 0b11)
+    bitrate_index = data[offset + 2] >> 4
+    sample_rate_index = (data[offset + 2] >> 2) & 0b11
+    if version == 0b01 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None  # reserved values or free format, which can't be walked
+
+    mpeg1 = version == 0b11
+    bitrate = MP3_BITRATES[mpeg1][layer][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][sample_rate_index]
+    padding = (data[offset + 2] >> 1) & 1
+    if layer == 1:
+        samples, length = 384, (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or mpeg1:
+        samples, length = 1152, 144 * bitrate // sample_rate + padding
+    else:
+        samples, length = 576, 72 * bitrate // sample_rate + padding
+    return {
+        "mpeg1": mpeg1,
+        "mono": data[offset + 3] >> 6 == 0b11,
+        "sample_rate": sample_rate,
+        "samples": samples,
+        "length": length,
+    }
+
+
+def mp3_duration(data: bytes) -> float:
+    """Reads the length of an MP3 from its Xing/Info or VBRI tag, or by walking its frame headers.
+
+    The encoder delay and padding of a LAME tag are left out, so the result matches the
+    number of samples a decoder outputs. ffmpeg writes the same tag under its own name.
+    """
+    offset = 0
+    if data[:3] == b"ID3":  # skip the ID3v2 tag
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        offset = 10 + size + (10 if data[5] & 0x10 else 0)
+    # Find the first frame
+    while offset < len(data) and parse_mp3_frame_header(data, offset) is None:
+        offset += 1
+    header = parse_mp3_frame_header(data, offset)
+    if header is None:
+        raise ValueError("No MPEG audio frame found")
+
+    if header["mpeg1"]:
+        side_info = 17 if header["mono"] else 32
+    else:
+        side_info = 9 if header["mono"] else 17
+    xing = offset + 4 + side_info
+    if data[xing : xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4 : xing + 8])[0]
+        if flags & 0x1:
+            frames = struct.unpack(">I", data[xing + 8 : xing + 12])[0]
+            samples = frames * header["samples"]
+            # The LAME tag follows the frames, bytes, TOC and quality fields
+            lame = xing + 8 + 4 * bool(flags & 0x1) + 4 * bool(flags & 0x2)
+            lame += 100 * bool(flags & 0x4) + 4 * bool(flags & 0x8)
+            if data[lame : lame + 4] in LAME_TAG_ENCODERS:
+                delay_padding = data[lame + 21 : lame + 24]
+                delay = (delay_padding[0] << 4) | (delay_padding[1] >> 4)
+                padding = ((delay_padding[1] & 0x0F) << 8) | delay_padding[2]
+                samples -= delay + padding
+            return samples / header["sample_rate"]
+    vbri = offset + 4 + 32
+    if data[vbri : vbri + 4] == b"VBRI":
+        frames = struct.unpack(">I", data[vbri + 14 : vbri + 18])[0]
+        return frames * header["samples"] / header["sample_rate"]
+
+    # No tag, count the frames
+    sample_rate = header["sample_rate"]
+    samples = 0
+    while header is not None:
+        samples += header["samples"]
+        offset += header["length"]
+        header = parse_mp3_frame_header(data, offset)
+    return samples / sample_rate
+
+
+def get_audio_format(path: str) -> Tuple[int, int]:
+    """Returns the (sample rate, channel count) of an MP3 or WAV file, or (44100, 1) if unknown."""
+    with open(path, "rb") as audio_file:
+        data = audio_file.read(64 * 1024)
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        channels, sample_rate = struct.unpack("<HI", data[22:28])
+        return sample_rate, channels
+    offset = 0
+    if data[:3] == b"ID3":
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        offset = 10 + size + (10 if data[5] & 0x10 else 0)
+        with open(path, "rb") as audio_file:
+            audio_file.seek(offset)
+            data = audio_file.read(64 * 1024)
+        offset = 0
+    while offset < len(data):
+        header = parse_mp3_frame_header(data, offset)
+        if header is not None:
+            return header["sample_rate"], 1 if header["mono"] else 2
+        offset += 1
+    return 44100, 1
+
+
+def wav_duration(data: bytes) -> float:
+    """Reads the length of a WAV file from its fmt and data chunks."""
+    byte_rate = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset : offset + 4]
+        chunk_size = struct.unpack("<I", data[offset + 4 : offset + 8])[0]
+        if chunk_id == b"fmt ":
+            byte_rate = struct.unpack("<I", data[offset + 16 : offset + 20])[0]
+        elif chunk_id == b"data" and byte_rate:
+            # Streamed WAVs leave the size unset, the data then runs to the end of the file
+            available = len(data) - offset - 8
+            return min(chunk_size, available) / byte_rate
+        offset += 8 + chunk_size + (chunk_size & 1)
+    raise ValueError("No fmt and data chunks found")
+
+
+def get_audio_duration(path: str) -> float:
+    """Returns the length of an audio file in seconds.
+
+    MP3 and WAV headers are parsed directly, ffprobe is only used when that fails.
+
+    Args:
+        path (str): Path to the audio file
+    """
+    try:
+        with open(path, "rb") as audio_file:
+            data = audio_file.read()
+        if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+            return wav_duration(data)
+        return mp3_duration(data)
+    except (ValueError, IndexError, struct.error):
+        profiling.count_subprocess()  # ffprobe
+        return float(ffmpeg.probe(path)["format"]["duration"])
+
+
+def save_durations(mp3_dir: str, durations: Dict[str, float]) -> None:
+    """Writes the length of every TTS clip of a thread to <mp3_dir>/durations.json
+
+    Args:
+        mp3_dir (str): The folder the clips were saved to
+        durations (Dict[str, float]): Length in seconds, keyed by the clip filename without extension
+    """
+    with open(f"{mp3_dir}/{MANIFEST_NAME}", "w", encoding="utf-8") as manifest:
+        json.dump(durations, manifest, indent=4)
+
+
+def load_durations(reddit_id: str) -> Dict[str, float]:
+    """Reads the durations manifest written by the TTS engine, or an empty one if there is none."""
+    path = f"assets/temp/{reddit_id}/mp3/{MANIFEST_NAME}"
+    if not exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as manifest:
+        return json.load(manifest)
+
+
+def get_clip_duration(reddit_id: str, name: str, durations: Dict[str, float]) -> float:
+    """Returns the length of assets/temp/<reddit_id>/mp3/<name>.mp3
+
+    The manifest is used when it knows the clip, the file is read otherwise.
+    """
+    if name in durations:
+        return durations[name]
+    return get_audio_duration(f"assets/temp/{reddit_id}/mp3/{name}.mp3")
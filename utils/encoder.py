@@ -0,0 +1,47 @@
+import json
+import multiprocessing
+from typing import Any, Dict, Optional
+
+from utils import settings
+
+# Encoders that understand -crf, -preset and -tune the way libx264 does
+CRF_ENCODERS = ("libx264", "libx265")
+
+
+def load_encoder_profiles() -> Dict[str, Dict[str, Any]]:
+    with open("./utils/encoder_profiles.json") as json_file:
+        profiles = json.load(json_file)
+    del profiles["__comment"]
+    return profiles
+
+
+def get_encoder_args(
+    profile_name: Optional[str] = None, codec: Optional[str] = None
+) -> Dict[str, Any]:
+    """Returns the ffmpeg output arguments for an encoder profile.
+
+    Args:
+        profile_name (str, optional): Name of the profile in utils/encoder_profiles.json. Defaults to the configured one.
+        codec (str, optional): The video encoder to use. Defaults to the configured one.
+
+    Returns:
+        Dict[str, Any]: Arguments to pass to ffmpeg.output
+    """
+    profile_name = profile_name or settings.config["settings"]["render"]["encoder_profile"]
+    codec = codec or settings.config["settings"]["render"]["video_codec"]
+    profile = encoder_profiles[profile_name]
+
+    # The tee muxer of the OnlyTTS video has no default audio encoder, so it is always named
+    args = {"c:v": codec, "g": profile["gop"], "c:a": "aac", "b:a": profile["audio_bitrate"]}
+    if codec in CRF_ENCODERS:
+        args["crf"] = profile["crf"]
+        args["preset"] = profile["preset"]
+        if profile["tune"] and codec == "libx264":
+            args["tune"] = profile["tune"]
+    else:
+        args["b:v"] = profile["bitrate"]
+    args["threads"] = multiprocessing.cpu_count()
+    return args
+
+
+encoder_profiles = load_encoder_profiles()
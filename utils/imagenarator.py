@@ -3,9 +3,9 @@ import re
 import textwrap
 
 from PIL import Image, ImageDraw, ImageFont
-from rich.progress import track
 
 from TTS.engine_wrapper import process_text
+from utils.console import track
 from utils.fonts import getheight, getsize
 
 
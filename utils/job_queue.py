@@ -0,0 +1,243 @@
+"""A SQLite backed queue of videos for the render daemon (python main.py --daemon).
+
+Jobs can be added and followed without loading the bot:
+
+    python -m utils.job_queue enqueue --subreddit tifu --wait
+    python -m utils.job_queue status 12
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from typing import Any, Dict, List, NamedTuple, Optional
+
+DEFAULT_QUEUE_PATH = "video_creation/data/jobs.db"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job(NamedTuple):
+    id: int
+    post_id: Optional[str]
+    overrides: Dict[str, Any]  # config values by their dotted path, e.g. "reddit.thread.subreddit"
+    status: str
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    outputs: Optional[Dict[str, str]]  # absolute paths of the finished files by kind
+    error: Optional[str]
+    progress: Optional[float]  # completed fraction of the render, between 0 and 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+
+class JobQueue:
+    """Jobs stored in a SQLite database, shared by the processes and threads using the same path.
+
+    Every call opens its own connection, so a JobQueue can be used from any thread.
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH):
+        self.path = path
+        with closing(self.connect()) as db:
+            db.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    post_id TEXT,
+                    overrides TEXT NOT NULL DEFAULT '{}',
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    outputs TEXT,
+                    error TEXT,
+                    progress REAL
+                )"""
+            )
+            # Queues made before the progress was recorded
+            columns = [row[1] for row in db.execute("PRAGMA table_info(jobs)")]
+            if "progress" not in columns:
+                db.execute("ALTER TABLE jobs ADD COLUMN progress REAL")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+
+    def connect(self) -> sqlite3.Connection:
+        # Autocommit, the transactions that need it are started explicitly
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def enqueue(self, post_id: str = None, overrides: Dict[str, Any] = None) -> int:
+        """Adds a job and returns its id.
+
+        Args:
+            post_id (str): The thread to make the video of, picked from the subreddit when not given
+            overrides (Dict[str, Any]): Config values for this job by their dotted path
+        """
+        with closing(self.connect()) as db:
+            cursor = db.execute(
+                "INSERT INTO jobs (post_id, overrides, status, created_at) VALUES (?, ?, ?, ?)",
+                (post_id, json.dumps(overrides or {}), QUEUED, time.time()),
+            )
+            return cursor.lastrowid
+
+    def claim(self) -> Optional[Job]:
+        """Marks the oldest queued job as running and returns it, None if the queue is empty."""
+        with closing(self.connect()) as db:
+            # IMMEDIATE takes the write lock up front, two workers can't claim the same job
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY id LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    return None
+                db.execute(
+                    "UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
+                    (RUNNING, time.time(), row[0]),
+                )
+            finally:
+                db.execute("COMMIT")
+        return self.get(row[0])
+
+    def update_progress(self, job_id: int, progress: float) -> None:
+        """Records how much of the render of a running job is done, between 0 and 1."""
+        with closing(self.connect()) as db:
+            db.execute("UPDATE jobs SET progress = ? WHERE id = ?", (progress, job_id))
+
+    def finish(self, job_id: int, outputs: Dict[str, str]) -> None:
+        """Marks a job as done and records the paths of the files it made."""
+        self._set_result(job_id, DONE, outputs=json.dumps(outputs))
+
+    def fail(self, job_id: int, error: str) -> None:
+        self._set_result(job_id, FAILED, error=error)
+
+    def _set_result(self, job_id: int, status: str, outputs: str = None, error: str = None):
+        with closing(self.connect()) as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, outputs = ?, error = ? WHERE id = ?",
+                (status, time.time(), outputs, error, job_id),
+            )
+
+    def requeue_running(self) -> int:
+        """Puts the jobs of a daemon that stopped while running them back in the queue."""
+        with closing(self.connect()) as db:
+            return db.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, progress = NULL WHERE status = ?",
+                (QUEUED, RUNNING),
+            ).rowcount
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with closing(self.connect()) as db:
+            row = db.execute(
+                "SELECT id, post_id, overrides, status, created_at, started_at, finished_at,"
+                " outputs, error, progress FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        return self._to_job(row) if row else None
+
+    def list(self, limit: int = 20) -> List[Job]:
+        """Returns the most recent jobs, newest first."""
+        with closing(self.connect()) as db:
+            rows = db.execute(
+                "SELECT id, post_id, overrides, status, created_at, started_at, finished_at,"
+                " outputs, error, progress FROM jobs ORDER BY id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def wait(self, job_id: int, poll_interval: float = 2.0) -> Job:
+        """Blocks until the job is done or failed and returns it."""
+        while True:
+            job = self.get(job_id)
+            if job is None or job.status in (DONE, FAILED):
+                return job
+            time.sleep(poll_interval)
+
+    @staticmethod
+    def _to_job(row) -> Job:
+        return Job(
+            id=row[0],
+            post_id=row[1],
+            overrides=json.loads(row[2]),
+            status=row[3],
+            created_at=row[4],
+            started_at=row[5],
+            finished_at=row[6],
+            outputs=json.loads(row[7]) if row[7] else None,
+            error=row[8],
+            progress=row[9],
+        )
+
+
+def parse_override(text: str):
+    """Parses a --set dotted.path=value argument, the value is read as JSON if possible."""
+    key, separator, value = text.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError(f"Expected dotted.path=value, got {text}")
+    try:
+        return key.strip(), json.loads(value)
+    except json.JSONDecodeError:
+        return key.strip(), value
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Queue videos for the render daemon.")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="Path of the queue database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Add a video to the queue")
+    enqueue.add_argument("--post-id", help="The thread to make the video of")
+    enqueue.add_argument("--subreddit", help="Subreddit to pick the thread from")
+    enqueue.add_argument(
+        "--set",
+        dest="overrides",
+        action="append",
+        default=[],
+        type=parse_override,
+        metavar="KEY=VALUE",
+        help="Config value for this video, e.g. settings.tts.voice_choice=tiktok",
+    )
+    enqueue.add_argument(
+        "--wait",
+        action="store_true",
+        help="Wait for the video and print its path, exits with 1 if it failed",
+    )
+
+    status = commands.add_parser("status", help="Show a job, or the most recent jobs")
+    status.add_argument("job_id", nargs="?", type=int)
+
+    args = parser.parse_args(argv)
+    queue = JobQueue(args.queue)
+
+    if args.command == "enqueue":
+        overrides = dict(args.overrides)
+        if args.subreddit:
+            overrides["reddit.thread.subreddit"] = args.subreddit
+        job_id = queue.enqueue(args.post_id, overrides)
+        if not args.wait:
+            print(job_id)
+            return 0
+        job = queue.wait(job_id)
+        if job.status != DONE:
+            print(f"Job {job_id} failed: {job.error}", file=sys.stderr)
+            return 1
+        print(job.outputs["video"])
+        return 0
+
+    if args.job_id is not None:
+        job = queue.get(args.job_id)
+        if job is None:
+            print(f"No job {args.job_id}", file=sys.stderr)
+            return 1
+        print(json.dumps(job.to_dict(), indent=4))
+    else:
+        print(json.dumps([job.to_dict() for job in queue.list()], indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,146 @@
+import json
+import os
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from utils.cache import ContentCache, get_cache_dir
+
+
 def clear_cookie_by_name(context, cookie_cleared_name):
     cookies = context.cookies()
     filtered_cookies = [cookie for cookie in cookies if cookie["name"] != cookie_cleared_name]
     context.clear_cookies()
     context.add_cookies(filtered_cookies)
+
+
+# Reused sessions are dropped this long before Reddit would expire them
+SESSION_EXPIRY_MARGIN = 60 * 60  # seconds
+
+
+def storage_state_path(username: str) -> str:
+    """Returns where the logged in browser state of the Reddit account is kept."""
+    return f"{get_cache_dir('browser')}/{ContentCache.key('reddit', username)}.json"
+
+
+def load_storage_state(path: str) -> Optional[dict]:
+    """Returns the saved browser state if its Reddit session is still valid, None otherwise."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    for cookie in state.get("cookies", []):
+        # Session cookies have no expiry (-1) and end with the browser that got them
+        if cookie["name"] == "reddit_session":
+            if cookie.get("expires", -1) > time.time() + SESSION_EXPIRY_MARGIN:
+                return state
+    return None
+
+
+def save_storage_state(context, path: str) -> bool:
+    """Saves the browser state if it is logged in to Reddit, returns whether it was saved."""
+    if not any(cookie["name"] == "reddit_session" for cookie in context.cookies()):
+        return False
+    # It holds the session cookies of the account, only the user may read it
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.chmod(path, 0o600)  # an existing file keeps its mode on open
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(context.storage_state(), f)
+    return True
+
+
+def _split_list(value: str) -> List[str]:
+    return [item.strip().lower() for item in (value or "").split(",") if item.strip()]
+
+
+def _matches_domain(host: str, domains: List[str]) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+class RequestFilter:
+    """Aborts the requests of a page that the screenshots don't need and counts its traffic.
+
+    Requests to allowed_domains are always loaded. Otherwise a request is aborted when its
+    resource type is one of blocked_types or its host is, or is below, one of blocked_domains.
+    The counts start over with every reset(), e.g. before the page opens the next comment.
+
+    Args:
+        blocked_types (List[str]): Playwright resource types, like "media" or "font"
+        blocked_domains (List[str]): Domains like "doubleclick.net"
+        allowed_domains (List[str]): Domains that are never blocked
+    """
+
+    def __init__(
+        self,
+        blocked_types: List[str],
+        blocked_domains: List[str],
+        allowed_domains: List[str],
+    ):
+        self.blocked_types = set(blocked_types)
+        self.blocked_domains = blocked_domains
+        self.allowed_domains = allowed_domains
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional["RequestFilter"]:
+        """Returns the filter of the [settings.browser] config, None if nothing is blocked."""
+        if not config["block_requests"]:
+            return None
+        return cls(
+            _split_list(config["blocked_resource_types"]),
+            _split_list(config["blocked_domains"]),
+            _split_list(config["allowed_domains"]),
+        )
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.blocked: Dict[str, int] = {}  # by resource type
+        self.bytes_loaded = 0
+
+    def blocks(self, url: str, resource_type: str) -> bool:
+        host = (urlsplit(url).hostname or "").lower()
+        if _matches_domain(host, self.allowed_domains):
+            return False
+        return resource_type in self.blocked_types or _matches_domain(host, self.blocked_domains)
+
+    def install(self, page) -> "RequestFilter":
+        """Filters the requests of the page from now on."""
+        page.route("**/*", self._route)
+        page.on("response", self._count_response)
+        return self
+
+    def _route(self, route) -> None:
+        request = route.request
+        self.requests += 1
+        if self.blocks(request.url, request.resource_type):
+            self.blocked[request.resource_type] = self.blocked.get(request.resource_type, 0) + 1
+            route.abort("blockedbyclient")
+        else:
+            route.continue_()
+
+    def _count_response(self, response) -> None:
+        # Responses sent in chunks have no length, the count is a lower bound
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.bytes_loaded += int(length)
+
+    def stats(self) -> Dict[str, object]:
+        """Returns the counts since the last reset(), e.g. for the span of the capture."""
+        return {
+            "requests": self.requests,
+            "requests_blocked": sum(self.blocked.values()),
+            "blocked_by_type": dict(self.blocked),
+            "bytes_loaded": self.bytes_loaded,
+        }
+
+
+def page_load_seconds(page) -> Optional[float]:
+    """Returns how long the last navigation of the page took until its load event."""
+    milliseconds = page.evaluate(
+        """() => {
+            const [navigation] = performance.getEntriesByType("navigation");
+            return navigation && navigation.loadEventEnd > 0 ? navigation.loadEventEnd : null;
+        }"""
+    )
+    return milliseconds / 1000 if milliseconds is not None else None
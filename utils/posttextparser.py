@@ -1,21 +1,31 @@
 import os
 import re
 import time
+from functools import lru_cache
 from typing import List
 
-import spacy
-
+from utils import profiling
 from utils.console import print_step
 from utils.voice import sanitize_text
 
 
+# The model is loaded once and reused for every following post
+@lru_cache(maxsize=None)
+def load_spacy_model():
+    # spaCy is only needed by storymode, importing it takes a while
+    import spacy
+
+    return spacy.load("en_core_web_sm")
+
+
 # working good
 def posttextparser(obj, *, tried: bool = False) -> List[str]:
     text: str = re.sub("\n", " ", obj)
     try:
-        nlp = spacy.load("en_core_web_sm")
+        nlp = load_spacy_model()
     except OSError as e:
         if not tried:
+            profiling.count_subprocess()
             os.system("python -m spacy download en_core_web_sm")
             time.sleep(5)
             return posttextparser(obj, tried=True)
@@ -0,0 +1,293 @@
+"""Where the time of a run goes: wall and CPU time, memory, subprocesses and writes of every stage.
+
+Every run of the stage scheduler writes a JSON report to assets/reports. The reports of the last
+runs can be summed up without loading the bot:
+
+    python -m utils.profiling --last 20
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_REPORTS_DIR = "assets/reports"
+
+_local = threading.local()
+
+
+def current_span() -> Optional["Span"]:
+    """Returns the innermost span open in this thread, None outside of a profiled run."""
+    return getattr(_local, "span", None)
+
+
+def span(name: str, parent: "Span" = None, **attributes) -> "Span":
+    """Opens a span below the parent, by default the innermost span open in this thread.
+
+    Outside of a profiled run this does nothing, so code can be instrumented unconditionally.
+
+    Args:
+        name (str): Name of the span, e.g. "comment"
+        parent (Span): The span to add this one to, needed when running in another thread
+        attributes: Put in the report of the span, e.g. index=3
+    """
+    parent = parent or current_span()
+    if parent is None:
+        return nullcontext()
+    return parent.child(name, **attributes)
+
+
+def annotate(**attributes) -> None:
+    """Adds to the report of the innermost span open in this thread, if any."""
+    current = current_span()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def count_subprocess(count: int = 1) -> None:
+    """Counts the subprocesses the caller starts, like ffmpeg, in the innermost span open."""
+    current = current_span()
+    if current is not None:
+        with current.lock:
+            current.subprocesses += count
+
+
+@contextmanager
+def attach(parent: Optional["Span"]) -> Iterator[None]:
+    """Makes the spans opened in this thread go below the parent, e.g. in a worker thread."""
+    previous = current_span()
+    _local.span = parent
+    try:
+        yield
+    finally:
+        _local.span = previous
+
+
+def _thread_bytes_written() -> Optional[int]:
+    """Bytes the current thread passed to write calls, None where /proc is not available."""
+    try:
+        with open(f"/proc/self/task/{threading.get_native_id()}/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _usage(who) -> Optional[Any]:
+    return resource.getrusage(who) if resource is not None else None
+
+
+def _max_rss_mb(usage) -> Optional[float]:
+    if usage is None:
+        return None
+    # Kilobytes on Linux, bytes on macOS
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class Span:
+    """A timed part of a run, like a stage or the TTS of one comment.
+
+    The CPU time and the bytes written are those of the thread the span runs in. The children_*
+    numbers cover the subprocesses that finished meanwhile, like ffmpeg, and the peak RSS is the
+    high-water mark of the whole process. Those two are shared by all concurrent spans.
+    The subprocesses are those the bot reports with count_subprocess() while the span is open.
+    """
+
+    def __init__(self, name: str, parent: "Span" = None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+        self.children: List["Span"] = []
+        self.lock = threading.Lock()
+        self.subprocesses = 0
+        self.child_bytes_written = 0  # written by child spans running in other threads
+        self.thread_id = None
+        self.start = self.wall = self.cpu = self.bytes_written = None
+        self.children_cpu = self.children_bytes_written = None
+        self.peak_rss_mb = self.children_peak_rss_mb = None
+        self.error = None
+
+    def child(self, name: str, **attributes) -> "Span":
+        child = Span(name, self, **attributes)
+        with self.lock:
+            self.children.append(child)
+        return child
+
+    def __enter__(self) -> "Span":
+        self.thread_id = threading.get_ident()
+        self._previous = current_span()
+        _local.span = self
+        self._started = time.perf_counter()
+        self.start = self._started - self.root()._started
+        self._cpu = time.thread_time()
+        self._written = _thread_bytes_written()
+        self._children_usage = _usage(resource.RUSAGE_CHILDREN) if resource else None
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.wall = time.perf_counter() - self._started
+        self.cpu = time.thread_time() - self._cpu
+        written = _thread_bytes_written()
+        if written is not None and self._written is not None:
+            self.bytes_written = written - self._written + self.child_bytes_written
+        if self._children_usage is not None:
+            usage = _usage(resource.RUSAGE_CHILDREN)
+            self.children_cpu = (usage.ru_utime + usage.ru_stime) - (
+                self._children_usage.ru_utime + self._children_usage.ru_stime
+            )
+            self.children_bytes_written = (usage.ru_oublock - self._children_usage.ru_oublock) * 512
+            self.children_peak_rss_mb = _max_rss_mb(usage)
+            self.peak_rss_mb = _max_rss_mb(_usage(resource.RUSAGE_SELF))
+        if exc is not None:
+            self.error = repr(exc)
+        _local.span = self._previous
+        parent = self.parent
+        if parent is not None:
+            with parent.lock:
+                parent.subprocesses += self.subprocesses
+                # Writes in the same thread are already part of the parent's own count
+                if self.thread_id != parent.thread_id and self.bytes_written:
+                    parent.child_bytes_written += self.bytes_written
+
+    def root(self) -> "Span":
+        return self if self.parent is None else self.parent.root()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            **self.attributes,
+            "start_s": self.start,
+            "wall_s": self.wall,
+            "cpu_s": self.cpu,
+            "children_cpu_s": self.children_cpu,
+            "peak_rss_mb": self.peak_rss_mb,
+            "children_peak_rss_mb": self.children_peak_rss_mb,
+            "subprocesses": self.subprocesses,
+            "bytes_written": self.bytes_written,
+            "children_bytes_written": self.children_bytes_written,
+            "error": self.error,
+            "children": [child.to_dict() for child in self.children if child.wall is not None],
+        }
+
+
+class RunReport(Span):
+    """The root span of a run, saved as a JSON report when it ends."""
+
+    def __init__(self, name: str = "run", reports_dir: str = DEFAULT_REPORTS_DIR, **attributes):
+        super().__init__(name, **attributes)
+        self.reports_dir = reports_dir
+        self.started_at = time.time()
+        self.path = None
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        super().__exit__(exc_type, exc, tb)
+        try:
+            self.save()
+        except OSError:
+            pass  # A report that can't be written must not fail the run
+
+    def save(self) -> str:
+        os.makedirs(self.reports_dir, exist_ok=True)
+        self.path = os.path.join(
+            self.reports_dir,
+            time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+            + f"-{os.getpid()}-{id(self):x}.json",
+        )
+        report = {"started_at": self.started_at, **self.to_dict()}
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        return self.path
+
+
+def stage_name(name: str) -> str:
+    """Strips the video prefix of the stages of a batch, e.g. "video 2: tts" -> "tts"."""
+    return name.rsplit(": ", 1)[-1]
+
+
+def load_reports(reports_dir: str = DEFAULT_REPORTS_DIR, last: int = 20) -> List[dict]:
+    """Returns the last reports, oldest first."""
+    reports = []
+    for path in sorted(glob.glob(os.path.join(reports_dir, "*.json")))[-last:]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                reports.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return reports
+
+
+def percentile(values: List[float], percent: float) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(percent) - 1]
+
+
+def aggregate(reports: List[dict]) -> Dict[str, Dict[str, List[float]]]:
+    """Collects the numbers of every stage, and of the spans inside them, across reports.
+
+    Returns:
+        Dict[str, Dict[str, List[float]]]: The values by metric, by stage like "tts" or "tts/comment"
+    """
+    metrics: Dict[str, Dict[str, List[float]]] = {}
+
+    def add(key: str, span: dict) -> None:
+        values = metrics.setdefault(key, {})
+        for metric in ("wall_s", "cpu_s", "children_cpu_s", "peak_rss_mb", "bytes_written"):
+            if span.get(metric) is not None:
+                values.setdefault(metric, []).append(span[metric])
+        values.setdefault("subprocesses", []).append(span["subprocesses"])
+
+    for report in reports:
+        add("total", report)
+        for stage in report["children"]:
+            key = stage_name(stage["name"])
+            add(key, stage)
+            for child in stage["children"]:
+                add(f"{key}/{child['name']}", child)
+    return metrics
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sum up the stage timings of the last runs.")
+    parser.add_argument("--dir", default=DEFAULT_REPORTS_DIR, help="Folder of the run reports")
+    parser.add_argument("--last", type=int, default=20, help="How many runs to sum up")
+    args = parser.parse_args(argv)
+
+    reports = load_reports(args.dir, args.last)
+    if not reports:
+        print(f"No run reports in {args.dir}", file=sys.stderr)
+        return 1
+    print(f"{len(reports)} runs")
+    print(
+        f"{'stage':<28}{'count':>6}{'wall p50':>10}{'wall p95':>10}{'cpu p50':>10}"
+        f"{'cpu p95':>10}{'rss p95':>10}{'procs p50':>10}{'MB written p50':>16}"
+    )
+    for key, values in aggregate(reports).items():
+
+        def p(metric, percent, scale=1.0):
+            if metric not in values:
+                return "-"
+            return f"{percentile(values[metric], percent) / scale:.1f}"
+
+        print(
+            f"{key:<28}{len(values['subprocesses']):>6}{p('wall_s', 50):>10}{p('wall_s', 95):>10}"
+            f"{p('cpu_s', 50):>10}{p('cpu_s', 95):>10}{p('peak_rss_mb', 95):>10}"
+            f"{p('subprocesses', 50):>10}{p('bytes_written', 50, 1024 * 1024):>16}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
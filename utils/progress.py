@@ -0,0 +1,177 @@
+import threading
+from typing import IO, Callable, List, NamedTuple, Optional, Tuple
+
+import ffmpeg
+
+from utils import profiling
+
+
+class RenderProgress(NamedTuple):
+    """A progress report of a running render."""
+
+    progress: float  # completed fraction, between 0 and 1
+    out_time: Optional[float] = None  # seconds of video written so far
+    frame: Optional[int] = None
+    fps: Optional[float] = None  # encoding speed in frames per second
+    speed: Optional[float] = None  # encoding speed relative to real time
+    bitrate: Optional[str] = None  # e.g. "2488.3kbits/s"
+    render_id: Optional[str] = None  # id of the thread whose video it is, tells renders apart
+
+
+ProgressListener = Callable[[RenderProgress], None]
+ProgressRange = Tuple[float, float]  # the part of the whole render a step covers, e.g. (0.9, 1.0)
+
+_listeners: List[ProgressListener] = []
+
+
+def add_progress_listener(listener: ProgressListener) -> None:
+    """Registers a function that is called with every RenderProgress of every render."""
+    _listeners.append(listener)
+
+
+def remove_progress_listener(listener: ProgressListener) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def report_progress(progress: RenderProgress, callback: Optional[ProgressListener] = None) -> None:
+    """Passes a progress report to the given callback and to every registered listener."""
+    if callback is not None:
+        callback(progress)
+    for listener in list(_listeners):
+        listener(progress)
+
+
+def scale_progress(progress: RenderProgress, progress_range: ProgressRange) -> RenderProgress:
+    """Maps the progress of one step of a render to the progress of the whole render."""
+    start, end = progress_range
+    return progress._replace(progress=start + (end - start) * progress.progress)
+
+
+def _parse_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value.rstrip("x"))
+    except (AttributeError, ValueError):
+        return None  # missing or "N/A"
+
+
+class ProgressFfmpeg(threading.Thread):
+    """Reads the output of ffmpeg's -progress pipe:1 and reports it while ffmpeg runs.
+
+    ffmpeg writes a block of key=value lines about twice a second, each block ending with a
+    progress=continue or progress=end line.
+
+    Args:
+        vid_duration_seconds: Length of the video being rendered
+        progress_update_callback: Called with a RenderProgress after every block
+        pipe: The stdout of the ffmpeg process
+        progress_range: The part of the whole render this ffmpeg run covers
+        render_id: Put in every RenderProgress, see RenderProgress.render_id
+    """
+
+    def __init__(
+        self,
+        vid_duration_seconds,
+        progress_update_callback,
+        pipe: IO[bytes],
+        progress_range: ProgressRange = (0.0, 1.0),
+        render_id: Optional[str] = None,
+    ):
+        threading.Thread.__init__(self, name="ProgressFfmpeg", daemon=True)
+        self.vid_duration_seconds = vid_duration_seconds
+        self.progress_update_callback = progress_update_callback
+        self.pipe = pipe
+        self.progress_range = progress_range
+        self.render_id = render_id
+
+    def run(self):
+        block = {}
+        for raw_line in iter(self.pipe.readline, b""):
+            key, _, value = raw_line.decode("utf8", errors="replace").strip().partition("=")
+            block[key] = value
+            if key == "progress":
+                report_progress(
+                    scale_progress(self.parse_block(block), self.progress_range),
+                    self.progress_update_callback,
+                )
+                block = {}
+
+    def parse_block(self, block: dict) -> RenderProgress:
+        out_time_us = _parse_float(block.get("out_time_us", block.get("out_time_ms")))
+        out_time = out_time_us / 1000000.0 if out_time_us is not None else None
+        if block.get("progress") == "end":
+            progress = 1.0
+        elif out_time is not None:
+            progress = min(out_time / self.vid_duration_seconds, 1.0)
+        else:
+            progress = 0.0
+        frame = _parse_float(block.get("frame"))
+        return RenderProgress(
+            progress=progress,
+            out_time=out_time,
+            frame=int(frame) if frame is not None else None,
+            fps=_parse_float(block.get("fps")),
+            speed=_parse_float(block.get("speed")),
+            bitrate=block.get("bitrate"),
+            render_id=self.render_id,
+        )
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.join()
+
+
+def run_ffmpeg_with_progress(
+    output,
+    vid_duration_seconds,
+    progress_update_callback=None,
+    input_bytes: bytes = None,
+    progress_range: ProgressRange = (0.0, 1.0),
+    render_id: Optional[str] = None,
+) -> None:
+    """Runs an ffmpeg-python output and reports its progress while it runs.
+
+    Args:
+        output: The ffmpeg-python output node to run
+        vid_duration_seconds: Length of the video being rendered
+        progress_update_callback: Called with a RenderProgress about twice a second
+        input_bytes: Data written to the stdin of ffmpeg, if any
+        progress_range: The part of the whole render this ffmpeg run covers, the progress goes
+            from its start to its end
+        render_id: Put in every RenderProgress, see RenderProgress.render_id
+
+    Raises:
+        ffmpeg.Error: If ffmpeg exits with a non zero code
+    """
+    profiling.count_subprocess()
+    process = (
+        output.overwrite_output()
+        .global_args("-nostats", "-progress", "pipe:1")
+        .run_async(pipe_stdin=input_bytes is not None, pipe_stdout=True, pipe_stderr=True)
+    )
+
+    def feed_stdin():
+        try:
+            process.stdin.write(input_bytes)
+        except BrokenPipeError:
+            pass  # ffmpeg failed, its stderr tells why
+        finally:
+            process.stdin.close()
+
+    writer = None
+    if input_bytes is not None:
+        writer = threading.Thread(target=feed_stdin, name="FfmpegStdin", daemon=True)
+        writer.start()
+    # stdin and stdout are serviced by their own threads, so reading stderr here cannot deadlock
+    with ProgressFfmpeg(
+        vid_duration_seconds, progress_update_callback, process.stdout, progress_range, render_id
+    ):
+        err = process.stderr.read()
+        process.wait()
+    if writer is not None:
+        writer.join()
+    if process.returncode != 0:
+        raise ffmpeg.Error("ffmpeg", b"", err)
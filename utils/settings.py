@@ -1,6 +1,7 @@
 import re
+import sys
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Any, Callable, Dict, Tuple
 
 import toml
 from rich.console import Console
@@ -67,6 +68,14 @@ def check(value, checks, name):
     ):
         incorrect = True
 
+    if incorrect and not sys.stdin.isatty():
+        # Nobody can answer the prompt, e.g. the daemon started by Automator.sh with nohup,
+        # so the answer a user would most likely give is taken
+        if "default" in checks:
+            return checks["default"]
+        if get_check_value("optional", False):
+            return ""
+        raise ValueError(f"{name} is unset or incorrect, run main.py in a terminal to set it")
     if incorrect:
         value = handle_input(
             message=(
@@ -118,6 +127,9 @@ def check_toml(template_file, config_file) -> Tuple[bool, Dict]:
     try:
         config = toml.load(config_file)
     except toml.TomlDecodeError:
+        if not sys.stdin.isatty():
+            console.print(f"[red bold]Couldn't read {config_file}. Giving up.")
+            return False
         console.print(
             f"""[blue]Couldn't read {config_file}.
 Overwrite it?(y/n)"""
@@ -159,12 +171,42 @@ Creating it now."""
 If you see any prompts, that means that you have unset/incorrectly set variables, please input the correct values.\
 """
     )
-    crawl(template, check_vars)
+    try:
+        crawl(template, check_vars)
+    except ValueError as error:
+        console.print(f"[red bold]{error}. Giving up.")
+        return False
     with open(config_file, "w") as f:
         toml.dump(config, f)
     return config
 
 
+def apply_overrides(overrides: Dict[str, Any]) -> Callable[[], None]:
+    """Sets config values given by their dotted path, e.g. {"reddit.thread.subreddit": "tifu"}.
+
+    Returns:
+        Callable[[], None]: Restores the values the overrides replaced
+    """
+    missing = object()
+    previous = []
+    for dotted_path, value in overrides.items():
+        *parents, key = dotted_path.split(".")
+        obj = config
+        for parent in parents:
+            obj = obj.setdefault(parent, {})
+        previous.append((obj, key, obj.get(key, missing)))
+        obj[key] = value
+
+    def restore():
+        for obj, key, value in reversed(previous):
+            if value is missing:
+                obj.pop(key, None)
+            else:
+                obj[key] = value
+
+    return restore
+
+
 if __name__ == "__main__":
     directory = Path().absolute()
     check_toml(f"{directory}/utils/.config.template.toml", "config.toml")
@@ -0,0 +1,140 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence
+
+from rich.table import Table
+
+from utils import profiling
+from utils.console import console
+
+
+class Stage(NamedTuple):
+    name: str
+    func: Callable[..., Any]
+    depends_on: Sequence[str]
+
+
+class StageTiming(NamedTuple):
+    name: str
+    start: float  # seconds since the scheduler started
+    duration: float
+
+
+class StageScheduler:
+    """Runs the stages of a video concurrently, each one as soon as its dependencies are done.
+
+    Every stage is called with the results of the stages it depends on, in the order they are
+    listed. A failing stage stops the scheduling of new stages and its exception is raised once
+    the stages that are already running are done.
+
+    Every run writes a report of the time and resources its stages took, see utils.profiling.
+    """
+
+    def __init__(self, name: str = "run"):
+        self.name = name
+        self.report = None
+        self.stages: Dict[str, Stage] = {}
+        self.results: Dict[str, Any] = {}
+        self.timings: List[StageTiming] = []
+        self.started = None
+        self.finished = threading.Condition()
+        self.done = set()  # stages that finished, failed or will not run anymore
+
+    def add(self, name: str, func: Callable[..., Any], depends_on: Sequence[str] = ()) -> None:
+        """Adds a stage.
+
+        Args:
+            name (str): Unique name of the stage
+            func (Callable): Function running the stage
+            depends_on (Sequence[str]): Names of the stages that have to finish first
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage {name} was already added")
+        for dependency in depends_on:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage {name} depends on unknown stage {dependency}")
+        self.stages[name] = Stage(name, func, tuple(depends_on))
+
+    def peek(self, name: str, default=None):
+        """Returns the result of a stage if it is already done, the default otherwise."""
+        return self.results.get(name, default)
+
+    def wait_for(self, name: str, default=None):
+        """Blocks until a stage is done and returns its result, the default if it failed.
+
+        Lets a running stage wait for a stage it doesn't always need. Waiting for a stage that
+        depends on the caller never returns.
+        """
+        with self.finished:
+            self.finished.wait_for(lambda: name in self.done)
+            return self.results.get(name, default)
+
+    def run(self) -> Dict[str, Any]:
+        """Runs all stages and returns their results by name."""
+        self.report = profiling.RunReport(self.name)
+        with self.report:
+            return self._run()
+
+    def _run(self) -> Dict[str, Any]:
+        self.started = time.perf_counter()
+        pending = dict(self.stages)
+        running: Dict[Future, str] = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=max(1, len(self.stages))) as executor:
+            while pending or running:
+                if error is None:
+                    for stage in list(pending.values()):
+                        if all(dependency in self.results for dependency in stage.depends_on):
+                            del pending[stage.name]
+                            running[executor.submit(self._run_stage, stage)] = stage.name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                    except BaseException as e:
+                        error = error or e
+                if error is not None and pending:
+                    # Stages waiting for ones that will never run must not block forever
+                    self._set_done(*pending)
+        if error is not None:
+            raise error
+        return self.results
+
+    def _run_stage(self, stage: Stage):
+        start = time.perf_counter()
+        try:
+            with profiling.span(stage.name, self.report):
+                result = stage.func(*(self.results[dependency] for dependency in stage.depends_on))
+            self.results[stage.name] = result
+            return result
+        finally:
+            self.timings.append(
+                StageTiming(stage.name, start - self.started, time.perf_counter() - start)
+            )
+            self._set_done(stage.name)
+
+    def _set_done(self, *names: str) -> None:
+        with self.finished:
+            self.done.update(names)
+            self.finished.notify_all()
+
+    def print_summary(self) -> None:
+        """Prints how long every stage took and how much time running them concurrently saved."""
+        if self.started is None:
+            return
+        total = time.perf_counter() - self.started
+        table = Table(title="Stage timings")
+        table.add_column("Stage")
+        table.add_column("Started at", justify="right")
+        table.add_column("Duration", justify="right")
+        for timing in sorted(self.timings, key=lambda timing: timing.start):
+            table.add_row(timing.name, f"{timing.start:.1f}s", f"{timing.duration:.1f}s")
+        serial = sum(timing.duration for timing in self.timings)
+        table.add_row("total", "", f"{total:.1f}s (serial {serial:.1f}s)", style="bold")
+        console.print(table)
+        if self.report is not None and self.report.path:
+            console.print(f"Run report written to {self.report.path}")
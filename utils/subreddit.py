@@ -1,10 +1,14 @@
 import json
 from os.path import exists
+from typing import Set
 
 from utils import settings
 from utils.ai_methods import sort_by_similarity
 from utils.console import print_substep
 
+# Threads picked for videos that are not finished yet, a batch must not pick them again
+claimed_ids: Set[str] = set()
+
 
 def get_subreddit_undone(submissions: list, subreddit, times_checked=0, similarity_scores=None):
     """_summary_
@@ -30,7 +34,7 @@ def get_subreddit_undone(submissions: list, subreddit, times_checked=0, similari
     with open("./video_creation/data/videos.json", "r", encoding="utf-8") as done_vids_raw:
         done_videos = json.load(done_vids_raw)
     for i, submission in enumerate(submissions):
-        if already_done(done_videos, submission):
+        if already_done(done_videos, submission) or str(submission) in claimed_ids:
             continue
         if submission.over_18:
             try:
@@ -67,6 +71,7 @@ def get_subreddit_undone(submissions: list, subreddit, times_checked=0, similari
                     continue
         if settings.config["settings"]["storymode"] and not submission.is_self:
             continue
+        claimed_ids.add(str(submission))
         if similarity_scores is not None:
             return submission, similarity_scores[i].item()
         return submission
@@ -1,13 +1,50 @@
+import json
+import threading
+import time
+from typing import Optional
+
 import requests
 
+from utils.cache import get_cache_dir
 from utils.console import print_step
 
+LATEST_RELEASE_URL = "https://api.github.com/repos/elebumm/RedditVideoMakerBot/releases/latest"
+REQUEST_TIMEOUT = 3  # seconds
+CHECK_INTERVAL = 24 * 60 * 60  # the latest version is looked up at most once a day
+
+
+def _cache_path() -> str:
+    return f"{get_cache_dir('version')}/latest_release.json"
+
+
+def get_cached_version() -> Optional[str]:
+    """Returns the latest version found by a check of the last CHECK_INTERVAL, if any."""
+    try:
+        with open(_cache_path(), encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - cached.get("checked_at", 0) > CHECK_INTERVAL:
+        return None
+    return cached.get("tag_name")
+
+
+def fetch_latest_version() -> Optional[str]:
+    """Looks up the latest release on GitHub and caches it, None if GitHub can't be reached."""
+    try:
+        response = requests.get(LATEST_RELEASE_URL, timeout=REQUEST_TIMEOUT)
+        latestversion = response.json()["tag_name"]
+    except (requests.RequestException, ValueError, KeyError, TypeError):
+        return None  # offline or rate limited, the next run tries again
+    try:
+        with open(_cache_path(), "w", encoding="utf-8") as f:
+            json.dump({"tag_name": latestversion, "checked_at": time.time()}, f)
+    except OSError:
+        pass
+    return latestversion
 
-def checkversion(__VERSION__: str):
-    response = requests.get(
-        "https://api.github.com/repos/elebumm/RedditVideoMakerBot/releases/latest"
-    )
-    latestversion = response.json()["tag_name"]
+
+def print_version_status(__VERSION__: str, latestversion: str) -> bool:
     if __VERSION__ == latestversion:
         print_step(f"You are using the newest version ({__VERSION__}) of the bot")
         return True
@@ -19,3 +56,28 @@ def checkversion(__VERSION__: str):
         print_step(
             f"Welcome to the test version ({__VERSION__}) of the bot. Thanks for testing and feel free to report any bugs you find."
         )
+    return False
+
+
+def checkversion(__VERSION__: str) -> Optional[threading.Thread]:
+    """Tells whether a newer version of the bot was released, without making startup wait.
+
+    A version found in the last CHECK_INTERVAL is used right away. Otherwise GitHub is asked in a
+    background thread, which prints the result once it arrives and stays quiet when offline.
+
+    Returns:
+        Optional[threading.Thread]: The thread asking GitHub, None if the cache was used
+    """
+    latestversion = get_cached_version()
+    if latestversion is not None:
+        print_version_status(__VERSION__, latestversion)
+        return None
+
+    def check():
+        latestversion = fetch_latest_version()
+        if latestversion is not None:
+            print_version_status(__VERSION__, latestversion)
+
+    thread = threading.Thread(target=check, name="VersionCheck", daemon=True)
+    thread.start()
+    return thread
@@ -1,4 +1,5 @@
 import json
+import threading
 import time
 
 from praw.models import Submission
@@ -6,6 +7,9 @@ from praw.models import Submission
 from utils import settings
 from utils.console import print_step
 
+# Videos of a batch or the daemon can finish at the same time
+_videos_json_lock = threading.Lock()
+
 
 def check_done(
     redditobj: Submission,
@@ -43,7 +47,9 @@ def save_data(subreddit: str, filename: str, reddit_title: str, reddit_id: str,
         @param reddit_id:
         @param reddit_title:
     """
-    with open("./video_creation/data/videos.json", "r+", encoding="utf-8") as raw_vids:
+    with _videos_json_lock, open(
+        "./video_creation/data/videos.json", "r+", encoding="utf-8"
+    ) as raw_vids:
         done_vids = json.load(raw_vids)
         if reddit_id in [video["id"] for video in done_vids]:
             return  # video already done but was specified to continue anyway in the config file
@@ -0,0 +1,61 @@
+from typing import Final, List
+
+import ffmpeg
+import numpy as np
+
+from utils import profiling
+
+SAMPLE_RATE: Final[int] = 44100
+CHANNELS: Final[int] = 2
+# Once the TTS ends, amix fades the background back to full volume over this many seconds
+DROPOUT_TRANSITION: Final[float] = 2.0
+
+
+def decode_audio(paths: List[str]) -> np.ndarray:
+    """Decodes the given audio files one after another into a single PCM buffer.
+
+    Args:
+        paths (List[str]): The audio files, in playing order
+
+    Returns:
+        np.ndarray: float32 samples with the shape (frames, CHANNELS)
+    """
+    streams = [ffmpeg.input(path)["a"] for path in paths]
+    stream = streams[0] if len(streams) == 1 else ffmpeg.concat(*streams, a=1, v=0)
+    profiling.count_subprocess()
+    out, _ = ffmpeg.output(stream, "pipe:", f="f32le", ac=CHANNELS, ar=SAMPLE_RATE).run(
+        capture_stdout=True, quiet=True
+    )
+    return np.frombuffer(out, np.float32).reshape(-1, CHANNELS)
+
+
+def pad_audio(samples: np.ndarray, frames: int) -> np.ndarray:
+    """Appends silence to the samples until they are the given number of frames long."""
+    if len(samples) >= frames:
+        return samples
+    return np.concatenate([samples, np.zeros((frames - len(samples), CHANNELS), np.float32)])
+
+
+def mix_background_audio(tts: np.ndarray, background: np.ndarray, volume: float) -> np.ndarray:
+    """Mixes the TTS with the background audio the way ffmpeg's amix (duration=longest) does.
+
+    Both inputs are halved while the TTS plays. Afterwards the background fades back to its
+    configured volume over DROPOUT_TRANSITION seconds.
+
+    Args:
+        tts (np.ndarray): The TTS samples
+        background (np.ndarray): The background audio samples
+        volume (float): Volume of the background audio
+
+    Returns:
+        np.ndarray: The mixed samples, as long as the longer input
+    """
+    frames = max(len(tts), len(background))
+    tts_end = len(tts)
+    gain = np.interp(
+        np.arange(frames),
+        [tts_end, tts_end + DROPOUT_TRANSITION * SAMPLE_RATE],
+        [0.5, 1.0],
+    ).astype(np.float32)[:, np.newaxis]
+    mixed = pad_audio(tts, frames) * 0.5 + pad_audio(background, frames) * volume * gain
+    return np.clip(mixed, -1.0, 1.0)
@@ -5,13 +5,12 @@ from pathlib import Path
 from random import randrange
 from typing import Any, Dict, Tuple
 
-import yt_dlp
-from moviepy.editor import AudioFileClip, VideoFileClip
-from moviepy.video.io.ffmpeg_tools import ffmpeg_extract_subclip
-
-from utils import settings
+from utils import profiling, settings
 from utils.console import print_step, print_substep
 
+# Where the downloaded backgrounds are kept, in a video and an audio folder
+BACKGROUNDS_DIR = "assets/backgrounds"
+
 
 def load_background_options():
     background_options = {}
@@ -75,10 +74,10 @@ def get_background_config(mode: str):
 
 def download_background_video(background_config: Tuple[str, str, str, Any]):
     """Downloads the background/s video from YouTube."""
-    Path("./assets/backgrounds/video/").mkdir(parents=True, exist_ok=True)
+    Path(f"{BACKGROUNDS_DIR}/video").mkdir(parents=True, exist_ok=True)
     # note: make sure the file name doesn't include an - in it
     uri, filename, credit, _ = background_config
-    if Path(f"assets/backgrounds/video/{credit}-{filename}").is_file():
+    if Path(f"{BACKGROUNDS_DIR}/video/{credit}-{filename}").is_file():
         return
     print_step(
         "We need to download the backgrounds videos. they are fairly large but it's only done once. 😎"
@@ -87,10 +86,13 @@ def download_background_video(background_config: Tuple[str, str, str, Any]):
     print_substep(f"Downloading {filename} from {uri}")
     ydl_opts = {
         "format": "bestvideo[height<=1080][ext=mp4]",
-        "outtmpl": f"assets/backgrounds/video/{credit}-{filename}",
+        "outtmpl": f"{BACKGROUNDS_DIR}/video/{credit}-{filename}",
         "retries": 10,
     }
 
+    # yt-dlp is only loaded when a background is missing
+    import yt_dlp
+
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         ydl.download(uri)
     print_substep("Background video downloaded successfully! 🎉", style="bold green")
@@ -98,10 +100,10 @@ def download_background_video(background_config: Tuple[str, str, str, Any]):
 
 def download_background_audio(background_config: Tuple[str, str, str]):
     """Downloads the background/s audio from YouTube."""
-    Path("./assets/backgrounds/audio/").mkdir(parents=True, exist_ok=True)
+    Path(f"{BACKGROUNDS_DIR}/audio").mkdir(parents=True, exist_ok=True)
     # note: make sure the file name doesn't include an - in it
     uri, filename, credit = background_config
-    if Path(f"assets/backgrounds/audio/{credit}-{filename}").is_file():
+    if Path(f"{BACKGROUNDS_DIR}/audio/{credit}-{filename}").is_file():
         return
     print_step(
         "We need to download the backgrounds audio. they are fairly large but it's only done once. 😎"
@@ -109,11 +111,13 @@ def download_background_audio(background_config: Tuple[str, str, str]):
     print_substep("Downloading the backgrounds audio... please be patient 🙏 ")
     print_substep(f"Downloading {filename} from {uri}")
     ydl_opts = {
-        "outtmpl": f"./assets/backgrounds/audio/{credit}-{filename}",
+        "outtmpl": f"{BACKGROUNDS_DIR}/audio/{credit}-{filename}",
         "format": "bestaudio/best",
         "extract_audio": True,
     }
 
+    import yt_dlp
+
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         ydl.download([uri])
 
@@ -127,6 +131,9 @@ def chop_background(background_config: Dict[str, Tuple], video_length: int, redd
         background_config (Dict[str,Tuple]]) : Current background configuration
         video_length (int): Length of the clip where the background footage is to be taken out of
     """
+    from moviepy.editor import AudioFileClip, VideoFileClip
+    from moviepy.video.io.ffmpeg_tools import ffmpeg_extract_subclip
+
     id = re.sub(r"[^\w\s-]", "", reddit_object["thread_id"])
 
     if settings.config["settings"]["background"][f"background_audio_volume"] == 0:
@@ -134,7 +141,7 @@ def chop_background(background_config: Dict[str, Tuple], video_length: int, redd
     else:
         print_step("Finding a spot in the backgrounds audio to chop...✂️")
         audio_choice = f"{background_config['audio'][2]}-{background_config['audio'][1]}"
-        background_audio = AudioFileClip(f"assets/backgrounds/audio/{audio_choice}")
+        background_audio = AudioFileClip(f"{BACKGROUNDS_DIR}/audio/{audio_choice}")
         start_time_audio, end_time_audio = get_start_and_end_times(
             video_length, background_audio.duration
         )
@@ -143,21 +150,22 @@ def chop_background(background_config: Dict[str, Tuple], video_length: int, redd
 
     print_step("Finding a spot in the backgrounds video to chop...✂️")
     video_choice = f"{background_config['video'][2]}-{background_config['video'][1]}"
-    background_video = VideoFileClip(f"assets/backgrounds/video/{video_choice}")
+    background_video = VideoFileClip(f"{BACKGROUNDS_DIR}/video/{video_choice}")
     start_time_video, end_time_video = get_start_and_end_times(
         video_length, background_video.duration
     )
     # Extract video subclip
     try:
+        profiling.count_subprocess()
         ffmpeg_extract_subclip(
-            f"assets/backgrounds/video/{video_choice}",
+            f"{BACKGROUNDS_DIR}/video/{video_choice}",
             start_time_video,
             end_time_video,
             targetname=f"assets/temp/{id}/background.mp4",
         )
     except (OSError, IOError):  # ffmpeg issue see #348
         print_substep("FFMPEG issue. Trying again...")
-        with VideoFileClip(f"assets/backgrounds/video/{video_choice}") as video:
+        with VideoFileClip(f"{BACKGROUNDS_DIR}/video/{video_choice}") as video:
             new = video.subclip(start_time_video, end_time_video)
             new.write_videofile(f"assets/temp/{id}/background.mp4")
     print_substep("Background video chopped successfully!", style="bold green")
@@ -1,69 +1,48 @@
 import multiprocessing
 import os
 import re
-import tempfile
 import textwrap
-import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from fractions import Fraction
+from itertools import accumulate
 from os.path import exists  # Needs to be imported specifically
 from pathlib import Path
-from typing import Dict, Final, Tuple
+from typing import Dict, Final, List, Tuple
 
 import ffmpeg
-import translators
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 from rich.console import Console
 from rich.progress import track
 
-from utils import settings
+from utils import profiling, settings
 from utils.cleanup import cleanup
 from utils.console import print_step, print_substep
+from utils.durations import get_clip_duration, load_durations
+from utils.encoder import get_encoder_args
 from utils.fonts import getheight
+from utils.progress import (
+    ProgressRange,
+    RenderProgress,
+    report_progress,
+    run_ffmpeg_with_progress,
+    scale_progress,
+)
 from utils.thumbnail import create_thumbnail
 from utils.videos import save_data
+from video_creation.audio_mixer import (
+    CHANNELS,
+    SAMPLE_RATE,
+    decode_audio,
+    mix_background_audio,
+    pad_audio,
+)
 
 console = Console()
 
-
-class ProgressFfmpeg(threading.Thread):
-    def __init__(self, vid_duration_seconds, progress_update_callback):
-        threading.Thread.__init__(self, name="ProgressFfmpeg")
-        self.stop_event = threading.Event()
-        self.output_file = tempfile.NamedTemporaryFile(mode="w+", delete=False)
-        self.vid_duration_seconds = vid_duration_seconds
-        self.progress_update_callback = progress_update_callback
-
-    def run(self):
-        while not self.stop_event.is_set():
-            latest_progress = self.get_latest_ms_progress()
-            if latest_progress is not None:
-                completed_percent = latest_progress / self.vid_duration_seconds
-                self.progress_update_callback(completed_percent)
-            time.sleep(1)
-
-    def get_latest_ms_progress(self):
-        lines = self.output_file.readlines()
-
-        if lines:
-            for line in lines:
-                if "out_time_ms" in line:
-                    out_time_ms_str = line.split("=")[1].strip()
-                    if out_time_ms_str.isnumeric():
-                        return float(out_time_ms_str) / 1000000.0
-                    else:
-                        # Handle the case when "N/A" is encountered
-                        return None
-        return None
-
-    def stop(self):
-        self.stop_event.set()
-
-    def __enter__(self):
-        self.start()
-        return self
-
-    def __exit__(self, *args, **kwargs):
-        self.stop()
+# Part of the progress bar the segments take in segment mode, joining them only encodes the audio
+SEGMENTS_PROGRESS_SHARE = 0.9
 
 
 def name_normalize(name: str) -> str:
@@ -76,6 +55,8 @@ def name_normalize(name: str) -> str:
 
     lang = settings.config["reddit"]["thread"]["post_lang"]
     if lang:
+        import translators
+
         print_substep("Translating filename...")
         translated_name = translators.translate_text(name, translator="google", to_language=lang)
         return translated_name
@@ -91,16 +72,12 @@ def prepare_background(reddit_id: str, W: int, H: int) -> str:
         .output(
             output_path,
             an=None,
-            **{
-                "c:v": "h264",
-                "b:v": "20M",
-                "b:a": "192k",
-                "threads": multiprocessing.cpu_count(),
-            },
+            **get_encoder_args(),
         )
         .overwrite_output()
     )
     try:
+        profiling.count_subprocess()
         output.run(quiet=True)
     except ffmpeg.Error as e:
         print(e.stderr.decode("utf8"))
@@ -108,6 +85,28 @@ def prepare_background(reddit_id: str, W: int, H: int) -> str:
     return output_path
 
 
+def get_background_clip(reddit_id: str, W: int, H: int, single_pass: bool = None):
+    """Returns the cropped, audio-less background stream for the final render.
+
+    In single pass mode the crop happens inside the final filter graph and only the video stream
+    of background.mp4 is used, so there is no intermediate background_noaudio.mp4 to encode.
+
+    Args:
+        reddit_id (str): The ID of the thread
+        W (int): Width of the final video
+        H (int): Height of the final video
+        single_pass (bool, optional): Overrides the single_pass_background setting.
+    """
+    if single_pass is None:
+        single_pass = settings.config["settings"]["render"]["single_pass_background"]
+    if single_pass:
+        return (
+            ffmpeg.input(f"assets/temp/{reddit_id}/background.mp4")["v"]
+            .filter("crop", f"ih*({W}/{H})", "ih")
+        )
+    return ffmpeg.input(prepare_background(reddit_id, W=W, H=H))
+
+
 def create_fancy_thumbnail(image, text, text_color, padding, wrap=35):
     print_step(f"Creating fancy thumbnail for: {text}")
     font_title_size = 47
@@ -165,24 +164,217 @@ def create_fancy_thumbnail(image, text, text_color, padding, wrap=35):
     return image
 
 
-def merge_background_audio(audio: ffmpeg, reddit_id: str):
-    """Gather an audio and merge with assets/backgrounds/background.mp3
+def build_comment_timeline(
+    reddit_id: str,
+    image_paths: List[str],
+    durations: List[float],
+    width: int,
+    opacity: float,
+) -> str:
+    """Writes the screenshots as one pre-timed image stream for the concat demuxer.
+
+    Every screenshot is scaled to the given width, has the opacity applied and is centered on a
+    transparent canvas shared by all of them, so the final render needs a single overlay no
+    matter how many comments the video has.
+
     Args:
-        audio (ffmpeg): The TTS final audio but without background.
-        reddit_id (str): The ID of subreddit
+        reddit_id (str): The ID of the thread
+        image_paths (List[str]): The screenshots, in the order they are shown
+        durations (List[float]): How long every screenshot is shown, in seconds
+        width (int): Width the screenshots are scaled to
+        opacity (float): Opacity of the screenshots
+
+    Returns:
+        str: Path to the ffconcat file
     """
-    background_audio_volume = settings.config["settings"]["background"]["background_audio_volume"]
-    if background_audio_volume == 0:
-        return audio  # Return the original audio
-    else:
-        # sets volume to config
-        bg_audio = ffmpeg.input(f"assets/temp/{reddit_id}/background.mp3").filter(
-            "volume",
-            background_audio_volume,
+    images = []
+    for image_path in image_paths:
+        image = Image.open(image_path).convert("RGBA")
+        height = round(image.height * width / image.width)
+        image = image.resize((width, height), Image.LANCZOS)
+        alpha = image.getchannel("A").point(lambda a: round(a * opacity))
+        image.putalpha(alpha)
+        images.append(image)
+
+    canvas_height = max(image.height for image in images)
+    timeline_dir = f"assets/temp/{reddit_id}/png"
+    lines = ["ffconcat version 1.0"]
+    for i, (image, duration) in enumerate(zip(images, durations)):
+        frame = Image.new("RGBA", (width, canvas_height), (0, 0, 0, 0))
+        frame.paste(image, (0, (canvas_height - image.height) // 2))
+        frame.save(f"{timeline_dir}/timeline_{i}.png")
+        lines += [f"file 'timeline_{i}.png'", f"duration {duration:.6f}"]
+
+    # Nothing is shown once the last clip is over. The concat demuxer ignores the duration of
+    # the last entry, so the blank frame is listed twice.
+    blank = Image.new("RGBA", (width, canvas_height), (0, 0, 0, 0))
+    blank.save(f"{timeline_dir}/timeline_end.png")
+    lines += ["file 'timeline_end.png'", "duration 1", "file 'timeline_end.png'"]
+
+    timeline_path = f"{timeline_dir}/timeline.ffconcat"
+    with open(timeline_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return timeline_path
+
+
+def finish_video_stream(video_stream, W: int, H: int):
+    """Applies the filters every rendered frame goes through last."""
+    text = f" " #Removed mmention of bacground creator
+    video_stream = ffmpeg.drawtext(
+        video_stream,
+        text=text,
+        x=f"(w-text_w)",
+        y=f"(h-text_h)",
+        fontsize=5,
+        fontcolor="White",
+        fontfile=os.path.join("fonts", "Roboto-Regular.ttf"),
+    )
+    return video_stream.filter("scale", W, H)
+
+
+def render_segment(reddit_id: str, W: int, H: int, segment: dict, threads: int) -> str:
+    """Renders one segment of the timeline to a video-only mp4.
+
+    Args:
+        reddit_id (str): The ID of the thread
+        W (int): Width of the final video
+        H (int): Height of the final video
+        segment (dict): start (seconds), frame count, image and output path of the segment
+        threads (int): ffmpeg threads this segment may use
+
+    Returns:
+        str: Path to the rendered segment
+    """
+    background = (
+        ffmpeg.input(f"assets/temp/{reddit_id}/background.mp4", ss=segment["start"])["v"]
+        .filter("crop", f"ih*({W}/{H})", "ih")
+    )
+    background = background.overlay(
+        ffmpeg.input(segment["image"], loop=1)["v"],
+        x="(main_w-overlay_w)/2",
+        y="(main_h-overlay_h)/2",
+    )
+    encoder_args = get_encoder_args()
+    encoder_args["threads"] = threads
+    profiling.count_subprocess()
+    ffmpeg.output(
+        finish_video_stream(background, W, H),
+        segment["path"],
+        an=None,
+        f="mp4",
+        **{"frames:v": segment["frames"]},
+        **encoder_args,
+    ).overwrite_output().run(quiet=True)
+    return segment["path"]
+
+
+def render_segments(
+    reddit_id: str,
+    W: int,
+    H: int,
+    durations: List[float],
+    length: int,
+    workers: int,
+    progress_update_callback,
+    progress_range: ProgressRange = (0.0, 1.0),
+) -> str:
+    """Renders the comment timeline as independent segments in parallel and joins them.
+
+    The timeline is split at the comment boundaries, which are rounded to the frame grid of the
+    background so the joined video keeps the exact frame count. Every segment is rendered by its
+    own ffmpeg process and the results are joined by the concat demuxer without re-encoding.
+
+    Args:
+        reddit_id (str): The ID of the thread
+        W (int): Width of the final video
+        H (int): Height of the final video
+        durations (List[float]): How long every image of the comment timeline is shown
+        length (int): Length of the video
+        workers (int): How many segments are rendered at the same time
+        progress_update_callback: Called with a RenderProgress after every segment
+        progress_range: The part of the whole render the segments cover
+
+    Returns:
+        str: Path to the ffconcat file listing the rendered segments
+    """
+    segments_dir = f"assets/temp/{reddit_id}/segments"
+    Path(segments_dir).mkdir(parents=True, exist_ok=True)
+    profiling.count_subprocess()  # ffprobe
+    background_stream = next(
+        stream
+        for stream in ffmpeg.probe(f"assets/temp/{reddit_id}/background.mp4")["streams"]
+        if stream["codec_type"] == "video"
+    )
+    fps = Fraction(background_stream["r_frame_rate"])
+
+    # Every image of the timeline, then the blank frame until the end of the video
+    images = [f"assets/temp/{reddit_id}/png/timeline_{i}.png" for i in range(len(durations))]
+    images.append(f"assets/temp/{reddit_id}/png/timeline_end.png")
+    boundaries = [0.0] + list(accumulate(durations)) + [max(float(length), sum(durations))]
+    frame_boundaries = [round(boundary * fps) for boundary in boundaries]
+
+    segments = []
+    for i, image in enumerate(images):
+        frames = frame_boundaries[i + 1] - frame_boundaries[i]
+        if frames <= 0:
+            continue
+        segments.append(
+            {
+                "start": float(frame_boundaries[i] / fps),
+                "frames": frames,
+                "image": image,
+                "path": f"{segments_dir}/segment_{i:03d}.mp4",
+            }
         )
-        # Merges audio and background_audio
-        merged_audio = ffmpeg.filter([audio, bg_audio], "amix", duration="longest")
-        return merged_audio  # Return merged audio
+
+    total_frames = sum(segment["frames"] for segment in segments)
+    threads = max(1, multiprocessing.cpu_count() // workers)
+    done_frames = 0
+    started = time.time()
+    # The heavy lifting happens in the ffmpeg processes, the threads only wait for them
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(render_segment, reddit_id, W, H, segment, threads): segment
+            for segment in segments
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except ffmpeg.Error as e:
+                print(e.stderr.decode("utf8"))
+                exit(1)
+            done_frames += futures[future]["frames"]
+            progress = RenderProgress(
+                progress=done_frames / total_frames,
+                out_time=float(done_frames / fps),
+                frame=done_frames,
+                fps=done_frames / max(time.time() - started, 1e-6),
+                render_id=reddit_id,
+            )
+            report_progress(scale_progress(progress, progress_range), progress_update_callback)
+
+    segments_list = f"{segments_dir}/segments.ffconcat"
+    with open(segments_list, "w") as f:
+        f.write("ffconcat version 1.0\n")
+        for segment in segments:
+            f.write(f"file '{Path(segment['path']).name}'\n")
+    return segments_list
+
+
+def tee_outputs(outputs: List[Tuple[str, int]]) -> str:
+    """Builds the filename argument of ffmpeg's tee muxer.
+
+    Every slave gets the first video stream and one of the audio streams of the render.
+
+    Args:
+        outputs (List[Tuple[str, int]]): (path, audio stream index) for every mp4 to write
+    """
+    slaves = []
+    for path, audio_index in outputs:
+        # Backslashes, quotes and pipes are special characters in the tee muxer's slave list
+        escaped_path = re.sub(r"([\\'|])", r"\\\1", path)
+        slaves.append(f"[f=mp4:select=\\'v:0,a:{audio_index}\\']{escaped_path}")
+    return "|".join(slaves)
 
 
 def make_final_video(
@@ -190,13 +382,16 @@ def make_final_video(
     length: int,
     reddit_obj: dict,
     background_config: Dict[str, Tuple],
-):
+) -> Dict[str, str]:
     """Gathers audio clips, gathers all screenshots, stitches them together and saves the final video to assets/temp
     Args:
         number_of_clips (int): Index to end at when going through the screenshots'
         length (int): Length of the video
         reddit_obj (dict): The reddit object that contains the posts to read.
         background_config (Tuple[str, str, str, Any]): The background config to use.
+
+    Returns:
+        Dict[str, str]: Paths of the rendered files, "video" and "only_tts" if enabled
     """
     # settings values
     W: Final[int] = int(settings.config["settings"]["resolution_w"])
@@ -211,12 +406,18 @@ def make_final_video(
         and settings.config["settings"]["background"]["background_audio_volume"] != 0
     )
 
+    segment_workers = settings.config["settings"]["render"]["segment_workers"]
+    render_in_segments: bool = segment_workers > 1 and not settings.config["settings"]["storymode"]
+
     print_step("Creating the final video 🎥")
 
-    background_clip = ffmpeg.input(prepare_background(reddit_id, W=W, H=H))
+    # Segments crop and overlay the background themselves, the filter graph of the final
+    # render is only built without them
+    background_clip = None if render_in_segments else get_background_clip(reddit_id, W=W, H=H)
 
     # Gather all audio clips
-    audio_clips = list()
+    audio_paths = list()
+    durations = load_durations(reddit_id)
     if number_of_clips == 0 and settings.config["settings"]["storymode"] == "false":
         print(
             "No audio clips to gather. Please use a different TTS or post."
@@ -224,39 +425,36 @@ def make_final_video(
         exit()
     if settings.config["settings"]["storymode"]:
         if settings.config["settings"]["storymodemethod"] == 0:
-            audio_clips = [ffmpeg.input(f"assets/temp/{reddit_id}/mp3/title.mp3")]
-            audio_clips.insert(1, ffmpeg.input(f"assets/temp/{reddit_id}/mp3/postaudio.mp3"))
+            audio_paths = [f"assets/temp/{reddit_id}/mp3/title.mp3"]
+            audio_paths.insert(1, f"assets/temp/{reddit_id}/mp3/postaudio.mp3")
         elif settings.config["settings"]["storymodemethod"] == 1:
-            audio_clips = [
-                ffmpeg.input(f"assets/temp/{reddit_id}/mp3/postaudio-{i}.mp3")
+            audio_paths = [
+                f"assets/temp/{reddit_id}/mp3/postaudio-{i}.mp3"
                 for i in track(range(number_of_clips + 1), "Collecting the audio files...")
             ]
-            audio_clips.insert(0, ffmpeg.input(f"assets/temp/{reddit_id}/mp3/title.mp3"))
+            audio_paths.insert(0, f"assets/temp/{reddit_id}/mp3/title.mp3")
 
     else:
-        audio_clips = [
-            ffmpeg.input(f"assets/temp/{reddit_id}/mp3/{i}.mp3") for i in range(number_of_clips)
-        ]
-        audio_clips.insert(0, ffmpeg.input(f"assets/temp/{reddit_id}/mp3/title.mp3"))
+        audio_paths = [f"assets/temp/{reddit_id}/mp3/{i}.mp3" for i in range(number_of_clips)]
+        audio_paths.insert(0, f"assets/temp/{reddit_id}/mp3/title.mp3")
 
         audio_clips_durations = [
-            float(ffmpeg.probe(f"assets/temp/{reddit_id}/mp3/{i}.mp3")["format"]["duration"])
-            for i in range(number_of_clips)
+            get_clip_duration(reddit_id, name, durations)
+            for name in ["title"] + [f"{i}" for i in range(number_of_clips)]
         ]
-        audio_clips_durations.insert(
-            0,
-            float(ffmpeg.probe(f"assets/temp/{reddit_id}/mp3/title.mp3")["format"]["duration"]),
-        )
-    audio_concat = ffmpeg.concat(*audio_clips, a=1, v=0)
-    ffmpeg.output(
-        audio_concat, f"assets/temp/{reddit_id}/audio.mp3", **{"b:a": "192k"}
-    ).overwrite_output().run(quiet=True)
+    # The audio is assembled and mixed in memory and piped into the final render, so the TTS is
+    # decoded once and encoded once.
+    tts_pcm = decode_audio(audio_paths)
+    background_audio_volume = settings.config["settings"]["background"]["background_audio_volume"]
+    if background_audio_volume == 0:
+        final_pcm = tts_pcm
+    else:
+        background_pcm = decode_audio([f"assets/temp/{reddit_id}/background.mp3"])
+        final_pcm = mix_background_audio(tts_pcm, background_pcm, background_audio_volume)
 
     console.log(f"[bold green] Video Will Be: {length} Seconds Long")
 
     screenshot_width = int((W * 45) // 100)
-    audio = ffmpeg.input(f"assets/temp/{reddit_id}/audio.mp3")
-    final_audio = merge_background_audio(audio, reddit_id)
 
     image_clips = list()
 
@@ -289,15 +487,9 @@ def make_final_video(
     current_time = 0
     if settings.config["settings"]["storymode"]:
         audio_clips_durations = [
-            float(
-                ffmpeg.probe(f"assets/temp/{reddit_id}/mp3/postaudio-{i}.mp3")["format"]["duration"]
-            )
-            for i in range(number_of_clips)
+            get_clip_duration(reddit_id, name, durations)
+            for name in ["title"] + [f"postaudio-{i}" for i in range(number_of_clips)]
         ]
-        audio_clips_durations.insert(
-            0,
-            float(ffmpeg.probe(f"assets/temp/{reddit_id}/mp3/title.mp3")["format"]["duration"]),
-        )
          # Create a transparent image for other clips
         transparent_image = Image.new('RGBA', (screenshot_width, screenshot_width), (0, 0, 0, 0))
         transparent_image.save(f"assets/temp/{reddit_id}/png/transparent.png")
@@ -335,23 +527,28 @@ def make_final_video(
                 )
                 current_time += audio_clips_durations[i]
     else:
-        for i in range(0, number_of_clips + 1):
-            image_clips.append(
-                ffmpeg.input(f"assets/temp/{reddit_id}/png/comment_{i}.png")["v"].filter(
-                    "scale", screenshot_width, -1
-                )
-            )
-            image_overlay = image_clips[i].filter("colorchannelmixer", aa=opacity)
-            assert (
-                audio_clips_durations is not None
-            ), "Please make a GitHub issue if you see this. Ping @JasonLovesDoggo on GitHub."
+        assert (
+            audio_clips_durations is not None
+        ), "Please make a GitHub issue if you see this. Ping @JasonLovesDoggo on GitHub."
+        image_paths = [
+            f"assets/temp/{reddit_id}/png/comment_{i}.png" for i in range(number_of_clips + 1)
+        ]
+        if settings.config["settings"]["show_Reddit_Title"]:
+            image_paths.insert(0, f"assets/temp/{reddit_id}/png/title.png")
+        timeline = build_comment_timeline(
+            reddit_id,
+            image_paths[: number_of_clips + 1],
+            audio_clips_durations,
+            screenshot_width,
+            opacity,
+        )
+        if not render_in_segments:
             background_clip = background_clip.overlay(
-                image_overlay,
-                enable=f"between(t,{current_time},{current_time + audio_clips_durations[i]})",
+                ffmpeg.input(timeline, f="concat", safe=0)["v"],
                 x="(main_w-overlay_w)/2",
                 y="(main_h-overlay_h)/2",
+                eof_action="pass",
             )
-            current_time += audio_clips_durations[i]
 
     title = re.sub(r"[^\w\s-]", "", reddit_obj["thread_title"])
     idx = re.sub(r"[^\w\s-]", "", reddit_obj["thread_id"])
@@ -403,90 +600,102 @@ def make_final_video(
             thumbnailSave.save(f"./assets/temp/{reddit_id}/thumbnail.png")
             print_substep(f"Thumbnail - Building Thumbnail in assets/temp/{reddit_id}/thumbnail.png")
 
-    text = f" " #Removed mmention of bacground creator
-    background_clip = ffmpeg.drawtext(
-        background_clip,
-        text=text,
-        x=f"(w-text_w)",
-        y=f"(h-text_h)",
-        fontsize=5,
-        fontcolor="White",
-        fontfile=os.path.join("fonts", "Roboto-Regular.ttf"),
-    )
-    background_clip = background_clip.filter("scale", W, H)
     print_step("Rendering the video 🎥")
     from tqdm import tqdm
 
-    pbar = tqdm(total=100, desc="Progress: ", bar_format="{l_bar}{bar}", unit=" %")
+    pbar = tqdm(total=100, desc="Progress: ", bar_format="{l_bar}{bar} {postfix}", unit=" %")
 
-    def on_update_example(progress) -> None:
-        status = round(progress * 100, 2)
+    def on_update_example(progress: RenderProgress) -> None:
+        status = round(progress.progress * 100, 2)
         old_percentage = pbar.n
         pbar.update(status - old_percentage)
+        stats = []
+        if progress.fps is not None:
+            stats.append(f"{progress.fps:.1f} fps")
+        if progress.speed is not None:
+            stats.append(f"{progress.speed:.2f}x")
+        if progress.bitrate and progress.bitrate != "N/A":
+            stats.append(progress.bitrate)
+        pbar.set_postfix_str(", ".join(stats), refresh=False)
+
+    encoder_args = get_encoder_args()
+    progress_range = (0.0, 1.0)
+    if render_in_segments:
+        print_substep(f"Rendering the video in segments with {segment_workers} workers.")
+        segments_list = render_segments(
+            reddit_id,
+            W,
+            H,
+            audio_clips_durations,
+            length,
+            segment_workers,
+            on_update_example,
+            (0.0, SEGMENTS_PROGRESS_SHARE),
+        )
+        background_clip = ffmpeg.input(segments_list, f="concat", safe=0)["v"]
+        # The segments are already encoded, only the audio is encoded while joining them
+        encoder_args = {"c:v": "copy", "c:a": encoder_args["c:a"], "b:a": encoder_args["b:a"]}
+        progress_range = (SEGMENTS_PROGRESS_SHARE, 1.0)
+    else:
+        background_clip = finish_video_stream(background_clip, W, H)
 
     defaultPath = f"results/{subreddit}"
-    with ProgressFfmpeg(length, on_update_example) as progress:
-        path = defaultPath + f"/{filename}"
-        path = (
-            path[:251] + ".mp4"
+    path = defaultPath + f"/{filename}"
+    path = (
+        path[:251] + ".mp4"
+    )  # Prevent a error by limiting the path length, do not change this.
+    outputs = {"video": path}
+    if allowOnlyTTSFolder:
+        # Both audio tracks travel through the pipe as one 4 channel stream
+        pcm = np.hstack([final_pcm, pad_audio(tts_pcm, len(final_pcm))])
+        pcm_input = ffmpeg.input("pipe:", f="f32le", ac=2 * CHANNELS, ar=SAMPLE_RATE)["a"]
+        final_audio = pcm_input.filter("channelmap", map="0|1", channel_layout="stereo")
+        audio = pcm_input.filter("channelmap", map="2|3", channel_layout="stereo")
+        onlyTTSPath = defaultPath + f"/OnlyTTS/{filename}"
+        onlyTTSPath = (
+            onlyTTSPath[:251] + ".mp4"
         )  # Prevent a error by limiting the path length, do not change this.
-        try:
-            ffmpeg.output(
-                background_clip,
-                final_audio,
-                path,
-                f="mp4",
-                **{
-                    "c:v": "h264",
-                    "b:v": "20M",
-                    "b:a": "192k",
-                    "threads": multiprocessing.cpu_count(),
-                },
-            ).overwrite_output().global_args("-progress", progress.output_file.name).run(
-                quiet=True,
-                overwrite_output=True,
-                capture_stdout=False,
-                capture_stderr=False,
-            )
-        except ffmpeg.Error as e:
-            print(e.stderr.decode("utf8"))
-            exit(1)
+        outputs["only_tts"] = onlyTTSPath
+        print_substep("Rendering the Only TTS video alongside the main one.")
+        # The video stream is encoded once and the tee muxer writes it to both files,
+        # each paired with its own audio track.
+        output = ffmpeg.output(
+            background_clip,
+            final_audio,
+            audio,
+            tee_outputs([(path, 0), (onlyTTSPath, 1)]),
+            f="tee",
+            flags="+global_header",
+            **encoder_args,
+        )
+    else:
+        pcm = final_pcm
+        final_audio = ffmpeg.input("pipe:", f="f32le", ac=CHANNELS, ar=SAMPLE_RATE)["a"]
+        output = ffmpeg.output(
+            background_clip,
+            final_audio,
+            path,
+            f="mp4",
+            **encoder_args,
+        )
+    try:
+        run_ffmpeg_with_progress(
+            output,
+            length,
+            on_update_example,
+            input_bytes=pcm.tobytes(),
+            progress_range=progress_range,
+            render_id=reddit_id,
+        )
+    except ffmpeg.Error as e:
+        print(e.stderr.decode("utf8"))
+        exit(1)
     old_percentage = pbar.n
     pbar.update(100 - old_percentage)
-    if allowOnlyTTSFolder:
-        path = defaultPath + f"/OnlyTTS/{filename}"
-        path = (
-            path[:251] + ".mp4"
-        )  # Prevent a error by limiting the path length, do not change this.
-        print_step("Rendering the Only TTS Video 🎥")
-        with ProgressFfmpeg(length, on_update_example) as progress:
-            try:
-                ffmpeg.output(
-                    background_clip,
-                    audio,
-                    path,
-                    f="mp4",
-                    **{
-                        "c:v": "h264",
-                        "b:v": "20M",
-                        "b:a": "192k",
-                        "threads": multiprocessing.cpu_count(),
-                    },
-                ).overwrite_output().global_args("-progress", progress.output_file.name).run(
-                    quiet=True,
-                    overwrite_output=True,
-                    capture_stdout=False,
-                    capture_stderr=False,
-                )
-            except ffmpeg.Error as e:
-                print(e.stderr.decode("utf8"))
-                exit(1)
-
-        old_percentage = pbar.n
-        pbar.update(100 - old_percentage)
     pbar.close()
     save_data(subreddit, filename + ".mp4", title, idx, background_config["video"][2])
     print_step("Removing temporary files 🗑")
     cleanups = cleanup(reddit_id)
     print_substep(f"Removed {cleanups} temporary files 🗑")
-    print_step("Done! 🎉 The video is in the results folder 📁")
\ No newline at end of file
+    print_step("Done! 🎉 The video is in the results folder 📁")
+    return outputs
\ No newline at end of file
@@ -1,42 +1,35 @@
 import json
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Final
+from typing import Callable, Dict, Final, List, Optional, Set, Tuple, Union
 
-import translators
-from playwright.sync_api import ViewportSize, sync_playwright
-from rich.progress import track
-
-from utils import settings
-from utils.console import print_step, print_substep
+from utils import profiling, settings
+from utils.comment_cards import make_comment_card, make_comment_cards
+from utils.console import print_step, print_substep, track
 from utils.imagenarator import imagemaker
-from utils.playwright import clear_cookie_by_name
+from utils.playwright import (
+    RequestFilter,
+    clear_cookie_by_name,
+    load_storage_state,
+    page_load_seconds,
+    save_storage_state,
+    storage_state_path,
+)
 from utils.videos import save_data
 
-__all__ = ["get_screenshots_of_reddit_posts"]
+__all__ = ["BrowserSession", "get_screenshots_of_reddit_posts"]
 
+LOGIN_TIMEOUT = 30000  # milliseconds Reddit gets to answer the login form
 
-def get_screenshots_of_reddit_posts(reddit_object: dict, screenshot_num: int):
-    """Downloads screenshots of reddit posts as seen on the web. Downloads to assets/temp/png
 
-    Args:
-        reddit_object (Dict): Reddit object received from reddit/subreddit.py
-        screenshot_num (int): Number of screenshots to download
-    """
-    # settings values
-    W: Final[int] = int(settings.config["settings"]["resolution_w"])
-    H: Final[int] = int(settings.config["settings"]["resolution_h"])
-    lang: Final[str] = settings.config["reddit"]["thread"]["post_lang"]
+def get_theme() -> Tuple[str, Tuple[int, int, int, int], Tuple[int, int, int], bool]:
+    """Returns the cookie file, background color, text color and transparency of the theme."""
     storymode: Final[bool] = settings.config["settings"]["storymode"]
-
-    print_step("Downloading screenshots of reddit posts...")
-    reddit_id = re.sub(r"[^\w\s-]", "", reddit_object["thread_id"])
-    # ! Make sure the reddit screenshots folder exists
-    Path(f"assets/temp/{reddit_id}/png").mkdir(parents=True, exist_ok=True)
-
     # set the theme and disable non-essential cookies
     if settings.config["settings"]["theme"] == "dark":
-        cookie_file = open("./video_creation/data/cookie-dark-mode.json", encoding="utf-8")
+        cookie_file = "./video_creation/data/cookie-dark-mode.json"
         bgcolor = (33, 33, 36, 255)
         txtcolor = (240, 240, 240)
         transparent = False
@@ -46,34 +39,59 @@ def get_screenshots_of_reddit_posts(reddit_object: dict, screenshot_num: int):
             bgcolor = (0, 0, 0, 0)
             txtcolor = (255, 255, 255)
             transparent = True
-            cookie_file = open("./video_creation/data/cookie-dark-mode.json", encoding="utf-8")
+            cookie_file = "./video_creation/data/cookie-dark-mode.json"
         else:
             # Switch to dark theme
-            cookie_file = open("./video_creation/data/cookie-dark-mode.json", encoding="utf-8")
+            cookie_file = "./video_creation/data/cookie-dark-mode.json"
             bgcolor = (33, 33, 36, 255)
             txtcolor = (240, 240, 240)
             transparent = False
     else:
-        cookie_file = open("./video_creation/data/cookie-light-mode.json", encoding="utf-8")
+        cookie_file = "./video_creation/data/cookie-light-mode.json"
         bgcolor = (255, 255, 255, 255)
         txtcolor = (0, 0, 0)
         transparent = False
+    return cookie_file, bgcolor, txtcolor, transparent
 
-    if storymode and settings.config["settings"]["storymodemethod"] == 1:
-        # for idx,item in enumerate(reddit_object["thread_post"]):
-        print_substep("Generating images...")
-        return imagemaker(
-            theme=bgcolor,
-            reddit_obj=reddit_object,
-            txtclr=txtcolor,
-            transparent=transparent,
-        )
 
-    screenshot_num: int
-    with sync_playwright() as p:
+class BrowserSession:
+    """A headless browser logged in to Reddit that takes the screenshots of one or more videos.
+
+    Playwright's sync API only works on the thread that started it, so the browser lives on a
+    dedicated thread and every screenshot job is handed to that thread. The browser is launched
+    and logged in on the first job and stays open until close() is called.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Browser")
+        self.playwright = None
+        self.browser = None
+        self.context = None
+
+    def run(self, func, *args):
+        """Calls func(context, *args) on the browser thread and returns its result."""
+        parent = profiling.current_span()
+        return self.executor.submit(self._run, parent, func, *args).result()
+
+    def _run(self, parent, func, *args):
+        # The spans of the job belong to the stage that handed it over
+        with profiling.attach(parent):
+            if self.context is None:
+                self.start()
+            return func(self.context, *args)
+
+    def start(self):
+        # Playwright is only loaded once a browser is needed, imagemaker runs without it
+        from playwright.sync_api import ViewportSize, sync_playwright
+
+        W: Final[int] = int(settings.config["settings"]["resolution_w"])
+        H: Final[int] = int(settings.config["settings"]["resolution_h"])
+        lang: Final[str] = settings.config["reddit"]["thread"]["post_lang"]
+
         print_substep("Launching Headless Browser...")
 
-        browser = p.chromium.launch(
+        self.playwright = sync_playwright().start()
+        self.browser = self.playwright.chromium.launch(
             headless=True
         )  # headless=False will show the browser for debugging purposes
         # Device scale factor (or dsf for short) allows us to increase the resolution of the screenshots
@@ -81,19 +99,34 @@ def get_screenshots_of_reddit_posts(reddit_object: dict, screenshot_num: int):
         # so we need a dsf such that the width of the screenshot is greater than the final resolution of the video
         dsf = (W // 600) + 1
 
-        context = browser.new_context(
+        state_path = storage_state_path(settings.config["reddit"]["creds"]["username"])
+        storage_state = load_storage_state(state_path)
+        context = self.browser.new_context(
             locale=lang or "en-us",
             color_scheme="dark",
             viewport=ViewportSize(width=W, height=H),
             device_scale_factor=dsf,
             user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+            storage_state=storage_state,
         )
-        cookies = json.load(cookie_file)
-        cookie_file.close()
+        with open(get_theme()[0], encoding="utf-8") as cookie_file:
+            cookies = json.load(cookie_file)
 
         context.add_cookies(cookies)  # load preference cookies
 
-        # Login to Reddit
+        if storage_state is None:
+            self.login(context)
+            if not save_storage_state(context, state_path):
+                print_substep("Could not confirm the Reddit login, logging in again next time.")
+        else:
+            print_substep("Reusing the saved Reddit login...")
+        self.context = context
+
+    def login(self, context):
+        """Logs the browser context in to Reddit with the credentials of the config."""
+        from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+        from playwright.sync_api import ViewportSize
+
         print_substep("Logging in to Reddit...")
         page = context.new_page()
         page.goto("https://www.reddit.com/login", timeout=0)
@@ -103,7 +136,16 @@ def get_screenshots_of_reddit_posts(reddit_object: dict, screenshot_num: int):
         page.locator(f'input[name="username"]').fill(settings.config["reddit"]["creds"]["username"])
         page.locator(f'input[name="password"]').fill(settings.config["reddit"]["creds"]["password"])
         page.get_by_role("button", name="Log In").click()
-        page.wait_for_timeout(5000)
+        try:
+            # Done once Reddit leaves the login page or shows why it can't log in
+            page.wait_for_function(
+                """() => !location.pathname.startsWith("/login") || [
+                    ...document.querySelectorAll(".AnimatedForm__errorMessage")
+                ].some(div => div.textContent.trim())""",
+                timeout=LOGIN_TIMEOUT,
+            )
+        except PlaywrightTimeoutError:
+            pass  # checked below, an unconfirmed login is not saved
 
         login_error_div = page.locator(".AnimatedForm__errorMessage").first
         if login_error_div.is_visible():
@@ -129,138 +171,364 @@ def get_screenshots_of_reddit_posts(reddit_object: dict, screenshot_num: int):
             clear_cookie_by_name(context, "redesign_optout")
             # Reload the page for the redesign to take effect
             page.reload()
-        # Get the thread screenshot
+        page.close()
+
+    def close(self):
+        """Closes the browser and stops its thread."""
+        self.executor.submit(self._close).result()
+        self.executor.shutdown()
+
+    def _close(self):
+        # close browser instance when we are done using it
+        if self.browser is not None:
+            self.browser.close()
+        if self.playwright is not None:
+            self.playwright.stop()
+        self.context = self.browser = self.playwright = None
+
+
+def get_screenshots_of_reddit_posts(
+    reddit_object: dict,
+    screenshot_num: Union[int, Callable[[], Optional[int]]],
+    browser_session: BrowserSession = None,
+):
+    """Downloads screenshots of reddit posts as seen on the web. Downloads to assets/temp/png
+
+    Args:
+        reddit_object (Dict): Reddit object received from reddit/subreddit.py
+        screenshot_num (int): Number of screenshots to download. Can also be a function returning
+            the number, or None while it is not known yet, which lets the screenshots start before
+            the TTS has decided how many comments fit in the video.
+        browser_session (BrowserSession): Browser to take the screenshots with, it stays open
+            afterwards. A new browser is launched and closed again when not given.
+    """
+    storymode: Final[bool] = settings.config["settings"]["storymode"]
+
+    print_step("Downloading screenshots of reddit posts...")
+    reddit_id = re.sub(r"[^\w\s-]", "", reddit_object["thread_id"])
+    # ! Make sure the reddit screenshots folder exists
+    Path(f"assets/temp/{reddit_id}/png").mkdir(parents=True, exist_ok=True)
+
+    _, bgcolor, txtcolor, transparent = get_theme()
+
+    if storymode and settings.config["settings"]["storymodemethod"] == 1:
+        # for idx,item in enumerate(reddit_object["thread_post"]):
+        print_substep("Generating images...")
+        return imagemaker(
+            theme=bgcolor,
+            reddit_obj=reddit_object,
+            txtclr=txtcolor,
+            transparent=transparent,
+        )
+
+    if settings.config["settings"]["screenshot_method"] == "offline":
+        print_substep("Drawing the comments...")
+        make_comment_cards(reddit_object, screenshot_num, bgcolor, txtcolor, transparent)
+        print_substep("Comments drawn Successfully.", style="bold green")
+        return
+
+    if browser_session is not None:
+        browser_session.run(take_screenshots, reddit_object, screenshot_num)
+    else:
+        browser_session = BrowserSession()
+        try:
+            browser_session.run(take_screenshots, reddit_object, screenshot_num)
+        finally:
+            browser_session.close()
+
+    print_substep("Screenshots downloaded Successfully.", style="bold green")
+
+
+def take_screenshots(
+    context, reddit_object: dict, screenshot_num: Union[int, Callable[[], Optional[int]]]
+):
+    """Takes the screenshots of a thread in a new page of the logged in browser context."""
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+    from playwright.sync_api import ViewportSize
+
+    W: Final[int] = int(settings.config["settings"]["resolution_w"])
+    H: Final[int] = int(settings.config["settings"]["resolution_h"])
+    lang: Final[str] = settings.config["reddit"]["thread"]["post_lang"]
+    storymode: Final[bool] = settings.config["settings"]["storymode"]
+    reddit_id = re.sub(r"[^\w\s-]", "", reddit_object["thread_id"])
+
+    # Get the thread screenshot
+    page = context.new_page()
+    request_filter = filter_requests(page)
+    with profiling.span("thread page"):
         page.goto(reddit_object["thread_url"], timeout=0)
         page.set_viewport_size(ViewportSize(width=W, height=H))
         page.wait_for_load_state()
-        page.wait_for_timeout(5000)
-
-        if page.locator(
+        try:
+            # The post, or the gate in front of it, is rendered by the scripts after the page loaded
+            page.locator(
+                '[data-test-id="post-content"], [data-testid="content-gate"]'
+            ).first.wait_for()
+        except PlaywrightTimeoutError:
+            pass  # the screenshot of the title below reports it
+        record_page_load(page, request_filter)
+
+    if page.locator(
+        "#t3_12hmbug > div > div._3xX726aBn29LDbsDtzr_6E._1Ap4F5maDtT1E1YuCiaO0r.D3IL3FD0RFy_mkKLPwL4 > div > div > button"
+    ).is_visible():
+        # This means the post is NSFW and requires to click the proceed button.
+
+        print_substep("Post is NSFW. You are spicy...")
+        page.locator(
             "#t3_12hmbug > div > div._3xX726aBn29LDbsDtzr_6E._1Ap4F5maDtT1E1YuCiaO0r.D3IL3FD0RFy_mkKLPwL4 > div > div > button"
-        ).is_visible():
-            # This means the post is NSFW and requires to click the proceed button.
+        ).click()
+        page.wait_for_load_state()  # Wait for page to fully load
+
+        # translate code
+    if page.locator(
+        "#SHORTCUT_FOCUSABLE_DIV > div:nth-child(7) > div > div > div > header > div > div._1m0iFpls1wkPZJVo38-LSh > button > i"
+    ).is_visible():
+        page.locator(
+            "#SHORTCUT_FOCUSABLE_DIV > div:nth-child(7) > div > div > div > header > div > div._1m0iFpls1wkPZJVo38-LSh > button > i"
+        ).click()  # Interest popup is showing, this code will close it
 
-            print_substep("Post is NSFW. You are spicy...")
-            page.locator(
-                "#t3_12hmbug > div > div._3xX726aBn29LDbsDtzr_6E._1Ap4F5maDtT1E1YuCiaO0r.D3IL3FD0RFy_mkKLPwL4 > div > div > button"
-            ).click()
-            page.wait_for_load_state()  # Wait for page to fully load
+    if lang:
+        import translators
 
-            # translate code
-        if page.locator(
-            "#SHORTCUT_FOCUSABLE_DIV > div:nth-child(7) > div > div > div > header > div > div._1m0iFpls1wkPZJVo38-LSh > button > i"
-        ).is_visible():
-            page.locator(
-                "#SHORTCUT_FOCUSABLE_DIV > div:nth-child(7) > div > div > div > header > div > div._1m0iFpls1wkPZJVo38-LSh > button > i"
-            ).click()  # Interest popup is showing, this code will close it
-
-        if lang:
-            print_substep("Translating post...")
-            texts_in_tl = translators.translate_text(
-                reddit_object["thread_title"],
-                to_language=lang,
-                translator="google",
-            )
+        print_substep("Translating post...")
+        texts_in_tl = translators.translate_text(
+            reddit_object["thread_title"],
+            to_language=lang,
+            translator="google",
+        )
 
-            page.evaluate(
-                "tl_content => document.querySelector('[data-adclicklocation=\"title\"] > div > div > h1').textContent = tl_content",
-                texts_in_tl,
-            )
+        page.evaluate(
+            "tl_content => document.querySelector('[data-adclicklocation=\"title\"] > div > div > h1').textContent = tl_content",
+            texts_in_tl,
+        )
+    else:
+        print_substep("Skipping translation...")
+
+    postcontentpath = f"assets/temp/{reddit_id}/png/title.png"
+    try:
+        if settings.config["settings"]["zoom"] != 1:
+            # store zoom settings
+            zoom = settings.config["settings"]["zoom"]
+            # zoom the body of the page
+            page.evaluate("document.body.style.zoom=" + str(zoom))
+            # as zooming the body doesn't change the properties of the divs, we need to adjust for the zoom
+            location = page.locator('[data-test-id="post-content"]').bounding_box()
+            for i in location:
+                location[i] = float("{:.2f}".format(location[i] * zoom))
+            page.screenshot(clip=location, path=postcontentpath)
         else:
-            print_substep("Skipping translation...")
+            page.locator('[data-test-id="post-content"]').screenshot(path=postcontentpath)
+    except Exception as e:
+        print_substep("Something went wrong!", style="red")
+        resp = input(
+            "Something went wrong with making the screenshots! Do you want to skip the post? (y/n) "
+        )
 
-        postcontentpath = f"assets/temp/{reddit_id}/png/title.png"
-        try:
-            if settings.config["settings"]["zoom"] != 1:
-                # store zoom settings
-                zoom = settings.config["settings"]["zoom"]
-                # zoom the body of the page
-                page.evaluate("document.body.style.zoom=" + str(zoom))
-                # as zooming the body doesn't change the properties of the divs, we need to adjust for the zoom
-                location = page.locator('[data-test-id="post-content"]').bounding_box()
-                for i in location:
-                    location[i] = float("{:.2f}".format(location[i] * zoom))
-                page.screenshot(clip=location, path=postcontentpath)
-            else:
-                page.locator('[data-test-id="post-content"]').screenshot(path=postcontentpath)
-        except Exception as e:
-            print_substep("Something went wrong!", style="red")
-            resp = input(
-                "Something went wrong with making the screenshots! Do you want to skip the post? (y/n) "
+        if resp.casefold().startswith("y"):
+            save_data("", "", "skipped", reddit_id, "")
+            print_substep(
+                "The post is successfully skipped! You can now restart the program and this post will skipped.",
+                "green",
             )
 
-            if resp.casefold().startswith("y"):
-                save_data("", "", "skipped", reddit_id, "")
-                print_substep(
-                    "The post is successfully skipped! You can now restart the program and this post will skipped.",
-                    "green",
-                )
-
-            resp = input("Do you want the error traceback for debugging purposes? (y/n)")
-            if not resp.casefold().startswith("y"):
-                exit()
+        resp = input("Do you want the error traceback for debugging purposes? (y/n)")
+        if not resp.casefold().startswith("y"):
+            exit()
 
-            raise e
+        raise e
 
-        if storymode:
-            page.locator('[data-click-id="text"]').first.screenshot(
-                path=f"assets/temp/{reddit_id}/png/story_content.png"
-            )
+    if storymode:
+        page.locator('[data-click-id="text"]').first.screenshot(
+            path=f"assets/temp/{reddit_id}/png/story_content.png"
+        )
+    else:
+        if callable(screenshot_num):
+            comments = reddit_object["comments"]
         else:
-            for idx, comment in enumerate(
-                track(
-                    reddit_object["comments"][:screenshot_num],
-                    "Downloading screenshots...",
-                )
+            comments = reddit_object["comments"][:screenshot_num]
+        take_comment_screenshots(
+            context,
+            comments,
+            screenshot_num,
+            reddit_id,
+            ViewportSize(width=W, height=H),
+            thread_page=page if settings.config["settings"]["comments_from_thread_page"] else None,
+        )
+
+    page.close()
+
+
+def take_comment_screenshots(
+    context,
+    comments: List[dict],
+    screenshot_num: Union[int, Callable[[], Optional[int]]],
+    reddit_id: str,
+    viewport,
+    thread_page=None,
+):
+    """Screenshots the comments, saved as comment_{idx}.png in comment order.
+
+    Comments found on the thread page are screenshotted right there. The others are opened with a
+    pool of pages: while a comment is screenshotted, the following ones already load in the other
+    pages of the pool, settings.screenshot_pages pages in total.
+
+    The TTS clip of a comment has the same index, so a comment that can't be screenshotted is
+    drawn as a card in its place instead of leaving a gap.
+
+    Args:
+        thread_page: The loaded page of the thread, None opens every comment on its own
+    """
+    on_thread_page = load_comments_on_page(thread_page, comments) if thread_page else set()
+    opened = [
+        idx for idx, comment in enumerate(comments) if comment["comment_id"] not in on_thread_page
+    ]
+    pages = [
+        context.new_page()
+        for _ in range(min(settings.config["settings"]["screenshot_pages"], len(opened)))
+    ]
+    request_filters = {}
+    for page in pages:
+        page.set_viewport_size(viewport)
+        request_filters[page] = filter_requests(page)
+    idle_pages = list(pages)
+    loading = deque()  # pages loading the opened comments from opened[0] on, in comment order
+    next_opened = 0
+
+    def limit_reached(idx: int) -> bool:
+        limit = screenshot_num() if callable(screenshot_num) else screenshot_num
+        return limit is not None and idx >= limit
+
+    try:
+        for idx, comment in enumerate(track(comments, "Downloading screenshots...")):
+            # Stop if we have reached the screenshot_num
+            if limit_reached(idx):
+                break
+            if comment["comment_id"] in on_thread_page:
+                with profiling.span("comment", index=idx, page="thread"):
+                    if not screenshot_comment(thread_page, comment, idx, reddit_id):
+                        draw_comment(comment, idx, reddit_id)
+                continue
+            while (
+                idle_pages
+                and next_opened < len(opened)
+                and not limit_reached(opened[next_opened])
             ):
-                # Stop if we have reached the screenshot_num
-                if idx >= screenshot_num:
-                    break
-
-                if page.locator('[data-testid="content-gate"]').is_visible():
-                    page.locator('[data-testid="content-gate"] button').click()
-
-                page.goto(f"https://new.reddit.com/{comment['comment_url']}")
-
-                # translate code
-
-                if settings.config["reddit"]["thread"]["post_lang"]:
-                    comment_tl = translators.translate_text(
-                        comment["comment_body"],
-                        translator="google",
-                        to_language=settings.config["reddit"]["thread"]["post_lang"],
-                    )
-                    page.evaluate(
-                        '([tl_content, tl_id]) => document.querySelector(`#t1_${tl_id} > div:nth-child(2) > div > div[data-testid="comment"] > div`).textContent = tl_content',
-                        [comment_tl, comment["comment_id"]],
-                    )
-                try:
-                    if settings.config["settings"]["zoom"] != 1:
-                        # store zoom settings
-                        zoom = settings.config["settings"]["zoom"]
-                        # zoom the body of the page
-                        page.evaluate("document.body.style.zoom=" + str(zoom))
-                        # scroll comment into view
-                        page.locator(f"#t1_{comment['comment_id']}").scroll_into_view_if_needed()
-                        # as zooming the body doesn't change the properties of the divs, we need to adjust for the zoom
-                        location = page.locator(f"#t1_{comment['comment_id']}").bounding_box()
-                        for i in location:
-                            location[i] = float("{:.2f}".format(location[i] * zoom))
-                        page.screenshot(
-                            clip=location,
-                            path=f"assets/temp/{reddit_id}/png/comment_{idx}.png",
-                        )
-                    else:
-                        page.locator(f"#t1_{comment['comment_id']}").screenshot(
-                            path=f"assets/temp/{reddit_id}/png/comment_{idx}.png"
-                        )
-                except TimeoutError:
-                    del reddit_object["comments"]
-                    screenshot_num += 1
-                    print("TimeoutError: Skipping screenshot...")
-                    continue
+                page = idle_pages.pop()
+                if request_filters[page] is not None:
+                    request_filters[page].reset()
+                # Returns as soon as the navigation starts, the page goes on loading meanwhile
+                page.goto(
+                    f"https://new.reddit.com/{comments[opened[next_opened]]['comment_url']}",
+                    wait_until="commit",
+                )
+                loading.append(page)
+                next_opened += 1
+            page = loading.popleft()
+            with profiling.span("comment", index=idx, page="permalink"):
+                page.wait_for_load_state()
+                record_page_load(page, request_filters[page])
+                if not screenshot_comment(page, comment, idx, reddit_id):
+                    draw_comment(comment, idx, reddit_id)
+            idle_pages.append(page)
+    finally:
+        for page in pages:
+            page.close()
+
+
+def draw_comment(comment: dict, idx: int, reddit_id: str) -> None:
+    """Draws a comment that could not be screenshotted as comment_{idx}.png."""
+    print_substep(f"Drawing comment {idx} instead, it was not found on its page.")
+    _, bgcolor, txtcolor, transparent = get_theme()
+    make_comment_card(
+        comment, f"assets/temp/{reddit_id}/png/comment_{idx}.png", bgcolor, txtcolor, transparent
+    )
+
+
+def filter_requests(page) -> Optional[RequestFilter]:
+    """Blocks the requests of the page that [settings.browser] leaves out, None if none are."""
+    request_filter = RequestFilter.from_config(settings.config["settings"]["browser"])
+    return request_filter.install(page) if request_filter is not None else None
+
+
+def record_page_load(page, request_filter: Optional[RequestFilter]) -> None:
+    """Adds how long the page took to load, and what it loaded and blocked, to the open span."""
+    if profiling.current_span() is None:
+        return
+    stats = request_filter.stats() if request_filter is not None else {}
+    profiling.annotate(load_s=page_load_seconds(page), **stats)
+
+
+def load_comments_on_page(page, comments: List[dict], rounds: int = 5) -> Set[str]:
+    """Loads more comments on the thread page until all of them are there or no more show up.
+
+    Returns:
+        Set[str]: The ids of the comments that are on the page
+    """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+    ids = [comment["comment_id"] for comment in comments]
+    find_comments = "ids => ids.filter(id => document.getElementById(`t1_${id}`))"
+    count_comments = "() => document.querySelectorAll('[id^=\"t1_\"]').length"
+    present = set(page.evaluate(find_comments, ids))
+    for _ in range(rounds):
+        if len(present) == len(ids):
+            break
+        before = page.evaluate(count_comments)
+        # Reddit adds the next comments when scrolled to the end or asked for more
+        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        more = page.locator('button:has-text("View more comments")')
+        if more.count():
+            more.first.click()
+        try:
+            page.wait_for_function(f"n => ({count_comments})() > n", arg=before, timeout=3000)
+        except PlaywrightTimeoutError:
+            break
+        present = set(page.evaluate(find_comments, ids))
+    return present
 
-        # close browser instance when we are done using it
-        browser.close()
 
-    print_substep("Screenshots downloaded Successfully.", style="bold green")
\ No newline at end of file
+def screenshot_comment(page, comment: dict, idx: int, reddit_id: str) -> bool:
+    """Screenshots a comment on its loaded page, False if it could not be found in time."""
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+    if page.locator('[data-testid="content-gate"]').is_visible():
+        page.locator('[data-testid="content-gate"] button').click()
+
+    # translate code
+
+    if settings.config["reddit"]["thread"]["post_lang"]:
+        import translators
+
+        comment_tl = translators.translate_text(
+            comment["comment_body"],
+            translator="google",
+            to_language=settings.config["reddit"]["thread"]["post_lang"],
+        )
+        page.evaluate(
+            '([tl_content, tl_id]) => document.querySelector(`#t1_${tl_id} > div:nth-child(2) > div > div[data-testid="comment"] > div`).textContent = tl_content',
+            [comment_tl, comment["comment_id"]],
+        )
+    try:
+        if settings.config["settings"]["zoom"] != 1:
+            # store zoom settings
+            zoom = settings.config["settings"]["zoom"]
+            # zoom the body of the page
+            page.evaluate("document.body.style.zoom=" + str(zoom))
+            # scroll comment into view
+            page.locator(f"#t1_{comment['comment_id']}").scroll_into_view_if_needed()
+            # as zooming the body doesn't change the properties of the divs, we need to adjust for the zoom
+            location = page.locator(f"#t1_{comment['comment_id']}").bounding_box()
+            for i in location:
+                location[i] = float("{:.2f}".format(location[i] * zoom))
+            page.screenshot(
+                clip=location,
+                path=f"assets/temp/{reddit_id}/png/comment_{idx}.png",
+            )
+        else:
+            page.locator(f"#t1_{comment['comment_id']}").screenshot(
+                path=f"assets/temp/{reddit_id}/png/comment_{idx}.png"
+            )
+    except PlaywrightTimeoutError:
+        print("TimeoutError: Skipping screenshot...")
+        return False
+    return True
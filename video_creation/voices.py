@@ -1,31 +1,32 @@
+import importlib
 from typing import Tuple
 
 from rich.console import Console
 
-from TTS.aws_polly import AWSPolly
-from TTS.elevenlabs import elevenlabs
 from TTS.engine_wrapper import TTSEngine
-from TTS.GTTS import GTTS
-from TTS.pyttsx import pyttsx
-from TTS.streamlabs_polly import StreamlabsPolly
-from TTS.TikTok import TikTok
-from TTS.gemini import GeminiTTS
 from utils import settings
 from utils.console import print_step, print_table
 
 console = Console()
 
+# Module and class of every provider. Their SDKs are slow to import, so only the chosen one is loaded
 TTSProviders = {
-    "GoogleTranslate": GTTS,
-    "AWSPolly": AWSPolly,
-    "StreamlabsPolly": StreamlabsPolly,
-    "TikTok": TikTok,
-    "pyttsx": pyttsx,
-    "ElevenLabs": elevenlabs,
-    "Gemini": GeminiTTS,
+    "GoogleTranslate": ("TTS.GTTS", "GTTS"),
+    "AWSPolly": ("TTS.aws_polly", "AWSPolly"),
+    "StreamlabsPolly": ("TTS.streamlabs_polly", "StreamlabsPolly"),
+    "TikTok": ("TTS.TikTok", "TikTok"),
+    "pyttsx": ("TTS.pyttsx", "pyttsx"),
+    "ElevenLabs": ("TTS.elevenlabs", "elevenlabs"),
+    "Gemini": ("TTS.gemini", "GeminiTTS"),
 }
 
 
+def load_tts_provider(name: str):
+    """Imports the class of a TTS provider by its name in TTSProviders, any case."""
+    module, class_name = get_case_insensitive_key_value(TTSProviders, name)
+    return getattr(importlib.import_module(module), class_name)
+
+
 def save_text_to_mp3(reddit_obj) -> Tuple[int, int]:
     """Saves text to MP3 files.
 
@@ -38,7 +39,7 @@ def save_text_to_mp3(reddit_obj) -> Tuple[int, int]:
 
     voice = settings.config["settings"]["tts"]["voice_choice"]
     if str(voice).casefold() in map(lambda _: _.casefold(), TTSProviders):
-        text_to_mp3 = TTSEngine(get_case_insensitive_key_value(TTSProviders, voice), reddit_obj)
+        text_to_mp3 = TTSEngine(load_tts_provider(voice), reddit_obj)
     else:
         while True:
             print_step("Please choose one of the following TTS providers: ")
@@ -47,7 +48,7 @@ def save_text_to_mp3(reddit_obj) -> Tuple[int, int]:
             if choice.casefold() in map(lambda _: _.casefold(), TTSProviders):
                 break
             print("Unknown Choice")
-        text_to_mp3 = TTSEngine(get_case_insensitive_key_value(TTSProviders, choice), reddit_obj)
+        text_to_mp3 = TTSEngine(load_tts_provider(choice), reddit_obj)
     return text_to_mp3.run()
 
 